@@ -0,0 +1,236 @@
+import argparse
+import logging
+import os
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import Engine, and_, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.db import engine
+from app.export import CHUNK_ROWS, ExportEntity, entity_statements, parquet_stream
+from app.models import Annotation, Message, MessageArchive, Project, ProjectStatus
+from app.partitions import add_months
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_PREFIX = "archive/messages"
+# Acima disso o buffer do upload/download vai para o disco.
+_SPOOL_BYTES = 32 * 1024 * 1024
+_UUID_COLUMNS = {"id", "project_id", "sender_id", "message_id"}
+
+
+class ArchiveError(RuntimeError):
+    pass
+
+
+def _bucket() -> str:
+    bucket = os.getenv("S3_BUCKET_PROCESSED")
+    if not bucket:
+        raise ArchiveError("S3_BUCKET_PROCESSED não configurado")
+    return bucket
+
+
+def _s3():
+    import boto3  # pesado: só o job de arquivamento precisa
+
+    return boto3.client("s3", region_name=os.getenv("AWS_REGION"))
+
+
+def _month_range(month: date) -> tuple[datetime, datetime]:
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    upper = add_months(month, 1)
+    return start, datetime(upper.year, upper.month, 1, tzinfo=timezone.utc)
+
+
+def _archivable_months(session: Session, project_id: uuid.UUID) -> list[date]:
+    # Só meses inteiros anteriores ao corte, para não mover um mês pela metade.
+    cutoff = datetime.now(timezone.utc) - timedelta(days=ARCHIVE_AFTER_DAYS)
+    month = func.date_trunc("month", func.timezone("UTC", Message.created_at))
+    rows = session.execute(
+        select(month.distinct())
+        .where(Message.project_id == project_id, Message.created_at < cutoff)
+        .order_by(month)
+    ).scalars()
+    # Mês com registro em message_archives não é arquivado de novo: se foi
+    # restaurado, fica quente (alguém pediu de volta); se ainda está no S3, as
+    # linhas quentes são retardatárias e não podem sobrescrever o Parquet.
+    done = set(
+        session.scalars(select(MessageArchive.month).where(MessageArchive.project_id == project_id))
+    )
+    return [
+        value.date()
+        for value in rows
+        if _month_range(value.date())[1] <= cutoff and value.date() not in done
+    ]
+
+
+def _upload(s3, bucket: str, key: str, chunks) -> None:
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES) as buffer:
+        for chunk in chunks:
+            buffer.write(chunk)
+        buffer.seek(0)
+        s3.upload_fileobj(buffer, bucket, key)
+
+
+def _locked_count(session: Session, stmt) -> int:
+    return session.scalar(select(func.count()).select_from(stmt.subquery()))
+
+
+def archive_project_month(s3, bucket: str, project_id: uuid.UUID, month: date, target: Engine = engine) -> int:
+    start, end = _month_range(month)
+    statements = entity_statements(project_id)
+    in_month = (Message.project_id == project_id, Message.created_at >= start, Message.created_at < end)
+    messages_stmt = statements[ExportEntity.MESSAGES].where(*in_month[1:])
+    annotations_stmt = statements[ExportEntity.ANNOTATIONS].where(*in_month[1:])
+    same_message = and_(Message.id == Annotation.message_id, Message.created_at == Annotation.message_created_at)
+
+    with Session(target) as session, session.begin():
+        # Trava o mês antes de exportar e só solta depois do delete: ninguém
+        # altera essas mensagens/anotações nem anota essas mensagens (a FK
+        # espera o lock) entre o Parquet e o delete. Linhas novas no mês não
+        # são travadas, mas mudam as contagens abaixo e abortam.
+        message_count = _locked_count(session, select(Message.id).where(*in_month).with_for_update())
+        annotation_count = _locked_count(
+            session,
+            select(Annotation.id).join(Message, same_message).where(*in_month).with_for_update(of=Annotation),
+        )
+        if message_count == 0:
+            return 0
+
+        prefix = f"{ARCHIVE_PREFIX}/project={project_id}/month={month:%Y-%m}"
+        messages_key = f"{prefix}/messages.parquet"
+        annotations_key = f"{prefix}/annotations.parquet"
+        _upload(s3, bucket, messages_key, parquet_stream(target, messages_stmt))
+        _upload(s3, bucket, annotations_key, parquet_stream(target, annotations_stmt))
+
+        deleted_annotations = session.execute(
+            delete(Annotation).where(same_message, *in_month)
+        ).rowcount
+        deleted_messages = session.execute(delete(Message).where(*in_month)).rowcount
+        if (deleted_messages, deleted_annotations) != (message_count, annotation_count):
+            # Alguém escreveu no mês durante a exportação: rollback, tenta na próxima rodada.
+            raise ArchiveError(
+                f"{project_id} {month:%Y-%m}: apagaria {deleted_messages}/{deleted_annotations} "
+                f"linhas, exportou {message_count}/{annotation_count}"
+            )
+        session.add(
+            MessageArchive(
+                project_id=project_id,
+                month=month,
+                bucket=bucket,
+                messages_key=messages_key,
+                annotations_key=annotations_key,
+                message_count=message_count,
+                annotation_count=annotation_count,
+            )
+        )
+    logger.info("Arquivadas %s mensagens de %s em %s", message_count, project_id, month.strftime("%Y-%m"))
+    return message_count
+
+
+def archive_projects(project_id: uuid.UUID | None = None, target: Engine = engine) -> int:
+    bucket = _bucket()
+    s3 = _s3()
+    stmt = select(Project.id).where(Project.status == ProjectStatus.ARCHIVED.value)
+    if project_id is not None:
+        stmt = stmt.where(Project.id == project_id)
+    with Session(target) as session:
+        work = [(pid, _archivable_months(session, pid)) for pid in session.scalars(stmt).all()]
+
+    archived = 0
+    for pid, months in work:
+        for month in months:
+            try:
+                archived += archive_project_month(s3, bucket, pid, month, target)
+            except ArchiveError:
+                logger.exception("Arquivamento adiado")
+    return archived
+
+
+def _download(s3, bucket: str, key: str):
+    buffer = tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES)
+    s3.download_fileobj(bucket, key, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _restore_rows(session: Session, model, buffer) -> int:
+    import pyarrow.parquet as pq
+
+    restored = 0
+    for batch in pq.ParquetFile(buffer).iter_batches(batch_size=CHUNK_ROWS):
+        rows = batch.to_pylist()
+        for row in rows:
+            for column in _UUID_COLUMNS.intersection(row):
+                if row[column] is not None:
+                    row[column] = uuid.UUID(row[column])
+        # Idempotente: uma restauração interrompida pode ser repetida.
+        session.execute(insert(model).values(rows).on_conflict_do_nothing())
+        restored += len(rows)
+    return restored
+
+
+def restore_project(project_id: uuid.UUID, target: Engine = engine) -> int:
+    with Session(target) as session:
+        archives = session.scalars(
+            select(MessageArchive)
+            .where(MessageArchive.project_id == project_id, MessageArchive.restored_at.is_(None))
+            .order_by(MessageArchive.month)
+        ).all()
+    if not archives:
+        return 0
+
+    s3 = _s3()
+    restored = 0
+    for archive in archives:
+        with _download(s3, archive.bucket, archive.messages_key) as messages, _download(
+            s3, archive.bucket, archive.annotations_key
+        ) as annotations:
+            with Session(target) as session, session.begin():
+                restored += _restore_rows(session, Message, messages)
+                _restore_rows(session, Annotation, annotations)
+                session.execute(
+                    update(MessageArchive).where(MessageArchive.id == archive.id).values(restored_at=func.now())
+                )
+                session.execute(
+                    update(Project)
+                    .where(Project.id == project_id)
+                    .values(
+                        version=Project.version + 1,
+                        last_message_at=func.greatest(
+                            Project.last_message_at,
+                            select(func.max(Message.created_at))
+                            .where(
+                                Message.project_id == project_id,
+                                Message.created_at >= _month_range(archive.month)[0],
+                                Message.created_at < _month_range(archive.month)[1],
+                            )
+                            .scalar_subquery(),
+                        ),
+                    )
+                )
+    logger.info("Restauradas %s mensagens de %s", restored, project_id)
+    return restored
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Arquiva mensagens antigas de projetos arquivados no S3.")
+    parser.add_argument("--project", type=uuid.UUID)
+    parser.add_argument("--restore", action="store_true", help="traz de volta as mensagens do --project")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.restore:
+        if args.project is None:
+            parser.error("--restore exige --project")
+        print(f"{restore_project(args.project)} mensagens restauradas")
+    else:
+        print(f"{archive_projects(args.project)} mensagens arquivadas")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 import os
+import time
 from contextlib import contextmanager
+from contextvars import ContextVar
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DisconnectionError
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 
+from app.metrics import TimedQueuePool, instrument_engine
+
 
 class Base(DeclarativeBase):
     pass
@@ -13,9 +18,70 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL não configurada")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, future=True)
+# always: ping em todo checkout; idle: só após DB_POOL_PRE_PING_IDLE_SECONDS
+# ociosa no pool; never: confia no pool_recycle.
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "always").lower()
+POOL_PRE_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PRE_PING_IDLE_SECONDS", "30"))
+if POOL_PRE_PING not in ("always", "idle", "never"):
+    raise RuntimeError("DB_POOL_PRE_PING deve ser always, idle ou never")
+
+
+def _create_engine(url: str, name: str):
+    new_engine = create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "-1")),
+        pool_pre_ping=POOL_PRE_PING == "always",
+        pool_logging_name=name,
+        future=True,
+    )
+    if POOL_PRE_PING == "idle":
+        _ping_when_idle(new_engine)
+    instrument_engine(new_engine, name)
+    return new_engine
+
+
+def _ping_when_idle(target) -> None:
+    @event.listens_for(target, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(target, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < POOL_PRE_PING_IDLE_SECONDS:
+            return
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            # Sem isso o SELECT 1 deixaria uma transação aberta na conexão.
+            dbapi_connection.rollback()
+        except Exception as exc:
+            # O pool descarta a conexão e tenta outra.
+            raise DisconnectionError() from exc
+
+
+engine = _create_engine(DATABASE_URL, "primary")
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, class_=Session)
 
+# Réplica opcional para leituras; sem ela tudo continua no primário.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+read_engine = _create_engine(DATABASE_READ_URL, "replica") if DATABASE_READ_URL else engine
+
+# Ligado pelo ReadYourWritesMiddleware logo após uma escrita do cliente.
+prefer_primary: ContextVar[bool] = ContextVar("prefer_primary", default=False)
+
+
+def reader_engine():
+    # Leituras toleram o atraso da réplica, exceto logo após o cliente escrever.
+    if prefer_primary.get():
+        return engine
+    return read_engine
+
 
 @contextmanager
 def session_scope():
@@ -29,9 +95,3 @@ def session_scope():
     finally:
         session.close()
 
-
-def ensure_schema() -> None:
-    # Importa os modelos para registrar as tabelas no metadata antes de criar.
-    from app import models  # noqa: F401
-
-    Base.metadata.create_all(engine)
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Optional
+
+import psycopg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.db import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "project_events"
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+RECONNECT_SECONDS = float(os.getenv("EVENTS_RECONNECT_SECONDS", "2"))
+
+
+def notify_project_event(session: Session, project_id: uuid.UUID, kind: str, entity_id: uuid.UUID) -> None:
+    # Entregue pelo Postgres só no commit; descartado em rollback.
+    payload = json.dumps({"project_id": str(project_id), "kind": kind, "id": str(entity_id)})
+    session.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+class Subscription:
+    def __init__(self, project_id: str):
+        self.project_id = project_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = False
+
+
+class ProjectEventHub:
+    # Uma conexão LISTEN por worker, distribuída para N assinantes em memória.
+
+    def __init__(self, dsn: str):
+        self._dsn = dsn
+        self._subscriptions: dict[str, set[Subscription]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscriptions.values())
+
+    def subscribe(self, project_id: uuid.UUID) -> Subscription:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+        subscription = Subscription(str(project_id))
+        self._subscriptions.setdefault(subscription.project_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subs = self._subscriptions.get(subscription.project_id)
+        if subs is None:
+            return
+        subs.discard(subscription)
+        if not subs:
+            del self._subscriptions[subscription.project_id]
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _publish(self, subs: set[Subscription], payload: str) -> None:
+        for subscription in list(subs):
+            try:
+                subscription.queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # Cliente lento: desconecta em vez de acumular memória; o
+                # EventSource reconecta e recarrega o estado.
+                subscription.dropped = True
+                self.unsubscribe(subscription)
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            project_id = json.loads(payload)["project_id"]
+        except (ValueError, KeyError):
+            logger.warning("Evento inválido em %s: %r", CHANNEL, payload)
+            return
+        subs = self._subscriptions.get(project_id)
+        if subs:
+            self._publish(subs, payload)
+
+    async def _listen(self) -> None:
+        connected_before = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self._dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    if connected_before:
+                        # Eventos podem ter sido perdidos durante a reconexão.
+                        for project_id, subs in list(self._subscriptions.items()):
+                            self._publish(subs, json.dumps({"project_id": project_id, "kind": "resync"}))
+                    connected_before = True
+                    async for notify in conn.notifies():
+                        self._dispatch(notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Conexão LISTEN perdida; reconectando")
+            await asyncio.sleep(RECONNECT_SECONDS)
+
+
+def _listener_dsn() -> str:
+    # psycopg não entende o sufixo "+psycopg" do SQLAlchemy.
+    return make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+hub = ProjectEventHub(_listener_dsn())
+
+
+async def sse_stream(project_id: uuid.UUID):
+    # Assina dentro do gerador para que o finally sempre libere a assinatura.
+    subscription = hub.subscribe(project_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            if subscription.dropped:
+                yield "event: dropped\ndata: {}\n\n"
+                return
+            try:
+                payload = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Mantém proxies (Render/Vercel) sem fechar a conexão ociosa.
+                yield ": ping\n\n"
+                continue
+            kind = json.loads(payload)["kind"]
+            yield f"event: {kind}\ndata: {payload}\n\n"
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,206 @@
+import csv
+import io
+import os
+import uuid
+from contextlib import contextmanager
+from enum import Enum
+from typing import Iterator
+
+from sqlalchemy import Boolean, Connection, Date, DateTime, Engine, Integer, Numeric, Select, and_, select
+
+from app.models import Annotation, DailyLog, Message, Milestone, Payment
+from app.serialization import dumps
+
+CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    PARQUET = "parquet"
+
+
+class ExportEntity(str, Enum):
+    MESSAGES = "messages"
+    ANNOTATIONS = "annotations"
+    DAILY_LOGS = "daily_logs"
+    MILESTONES = "milestones"
+    PAYMENTS = "payments"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.PARQUET: "application/vnd.apache.parquet",
+}
+
+
+def entity_statements(project_id: uuid.UUID) -> dict[ExportEntity, Select]:
+    # A ordenação só onde um índice (project_id, ...) a entrega sem sort.
+    return {
+        ExportEntity.MESSAGES: select(
+            Message.id,
+            Message.project_id,
+            Message.sender_id,
+            Message.type,
+            Message.url,
+            Message.transcript,
+            Message.created_at,
+        )
+        .where(Message.project_id == project_id)
+        .order_by(Message.created_at.desc()),
+        ExportEntity.ANNOTATIONS: select(
+            Annotation.id,
+            Annotation.message_id,
+            Annotation.message_created_at,
+            Annotation.area,
+            Annotation.task,
+            Annotation.phase,
+            Annotation.percent_complete,
+            Annotation.blocker,
+            Annotation.next_step,
+            Annotation.confidence,
+        )
+        .join(
+            Message,
+            and_(
+                Message.id == Annotation.message_id,
+                Message.created_at == Annotation.message_created_at,
+            ),
+        )
+        .where(Message.project_id == project_id),
+        ExportEntity.DAILY_LOGS: select(
+            DailyLog.id,
+            DailyLog.project_id,
+            DailyLog.date,
+            DailyLog.summary_text,
+            DailyLog.score_schedule,
+            DailyLog.score_budget,
+        )
+        .where(DailyLog.project_id == project_id)
+        .order_by(DailyLog.date.desc()),
+        ExportEntity.MILESTONES: select(
+            Milestone.id,
+            Milestone.project_id,
+            Milestone.name,
+            Milestone.amount,
+            Milestone.criteria,
+            Milestone.status,
+            Milestone.due_date,
+        ).where(Milestone.project_id == project_id),
+        ExportEntity.PAYMENTS: select(
+            Payment.id,
+            Payment.milestone_id,
+            Payment.provider,
+            Payment.link,
+            Payment.status,
+            Payment.paid_at,
+        )
+        .join(Milestone, Milestone.id == Payment.milestone_id)
+        .where(Milestone.project_id == project_id),
+    }
+
+
+@contextmanager
+def _snapshot(engine: Engine) -> Iterator[Connection]:
+    # Uma conexão e uma transação REPEATABLE READ para o arquivo inteiro: todas
+    # as entidades veem o mesmo instante, sem filhos órfãos de escritas no meio.
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="REPEATABLE READ", postgresql_readonly=True)
+        with conn.begin():
+            yield conn
+
+
+def _partitions(conn: Connection, stmt: Select) -> Iterator[list]:
+    # stream_results usa um cursor nomeado (server-side) no psycopg: só
+    # CHUNK_ROWS linhas ficam em memória por vez.
+    result = conn.execution_options(stream_results=True, max_row_buffer=CHUNK_ROWS).execute(stmt)
+    yield from result.partitions(CHUNK_ROWS)
+
+
+def ndjson_stream(engine: Engine, statements: dict[ExportEntity, Select]) -> Iterator[bytes]:
+    with _snapshot(engine) as conn:
+        for entity, stmt in statements.items():
+            keys = ["entity", *stmt.selected_columns.keys()]
+            for rows in _partitions(conn, stmt):
+                yield b"".join(dumps(dict(zip(keys, (entity.value, *row)))) + b"\n" for row in rows)
+
+
+def csv_stream(engine: Engine, stmt: Select) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(stmt.selected_columns.keys())
+    with _snapshot(engine) as conn:
+        for rows in _partitions(conn, stmt):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    # Destino do ParquetWriter: acumula só o row group corrente.
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _arrow_type(pa, column_type):
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Numeric) and column_type.precision is not None:
+        return pa.decimal128(column_type.precision, column_type.scale or 0)
+    # UUID, String, Text
+    return pa.string()
+
+
+def parquet_stream(engine: Engine, stmt: Select) -> Iterator[bytes]:
+    import pyarrow as pa  # opcional e pesado: só carrega quando exportado
+    import pyarrow.parquet as pq
+
+    columns = list(stmt.selected_columns)
+    schema = pa.schema([(column.key, _arrow_type(pa, column.type)) for column in columns])
+    as_text = [pa.types.is_string(field.type) for field in schema]
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        with _snapshot(engine) as conn:
+            for rows in _partitions(conn, stmt):
+                arrays = []
+                for index, field in enumerate(schema):
+                    values = [row[index] for row in rows]
+                    if as_text[index]:
+                        values = [None if value is None else str(value) for value in values]
+                    arrays.append(pa.array(values, type=field.type))
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,344 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+import jwt
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Counter
+from sqlalchemy import Engine, Row, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from starlette.requests import cookie_parser
+from starlette.routing import Match
+
+from app.db import engine
+from app.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+# Uma reserva mais velha que isso é de um worker que morreu no meio do POST.
+LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "1024"))
+PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_SECONDS", "3600"))
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+# Todo POST passa pelo middleware, menos o login por magic link: o consume
+# responde com o cookie de sessão, que nunca é guardado, então um replay
+# devolveria {"ok": true} sem sessão nenhuma; e o link já é de uso único.
+EXCLUDED_PREFIXES = ("/auth/magic/",)
+MAX_SCOPE_LENGTH = 255
+# Cabeçalhos que não vão para idempotency_keys: content-length é recalculado
+# no replay e cookies de sessão não podem ser servidos a outra requisição.
+_SKIPPED_HEADERS = {b"content-length", b"set-cookie", b"date", b"server"}
+
+_MISMATCH = b'{"detail":"Idempotency-Key j\\u00e1 usada com outro corpo"}'
+_IN_PROGRESS = b'{"detail":"Requisi\\u00e7\\u00e3o com esta Idempotency-Key em andamento"}'
+_INVALID = b'{"detail":"Idempotency-Key inv\\u00e1lida"}'
+
+REQUESTS = Counter(
+    "idempotency_requests_total",
+    "POSTs com Idempotency-Key por desfecho",
+    ["outcome"],
+)
+
+
+class StoredResponse(NamedTuple):
+    request_hash: bytes
+    status_code: int
+    headers: list[list[str]]
+    body: bytes
+    expires_at: float
+
+
+class ResponseCache:
+    # LRU por worker só com respostas finalizadas: elas não mudam até expirar,
+    # então não há o que invalidar.
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: OrderedDict[tuple[str, str], StoredResponse] = OrderedDict()
+
+    def get(self, cache_key: tuple[str, str]) -> Optional[StoredResponse]:
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[cache_key]
+            return None
+        self._entries.move_to_end(cache_key)
+        return entry
+
+    def put(self, cache_key: tuple[str, str], entry: StoredResponse) -> None:
+        if self.size <= 0:
+            return
+        self._entries[cache_key] = entry
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+
+def _request_hash(scope, body: bytes) -> bytes:
+    digest = hashlib.sha256()
+    digest.update(scope.get("query_string", b""))
+    digest.update(b"\0")
+    digest.update(body)
+    return digest.digest()
+
+
+def _caller(scope) -> str:
+    # Mesmo JWT que auth_magic emite, via Bearer ou cookie. Sem token válido a
+    # chave fica no escopo anônimo da rota.
+    token = None
+    for name, value in scope["headers"]:
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            token = value[7:].decode("latin-1").strip()
+        elif name == b"cookie" and token is None:
+            token = cookie_parser(value.decode("latin-1")).get("zenbild_token")
+    secret = os.getenv("JWT_SECRET")
+    if not token or not secret:
+        return "anon"
+    try:
+        payload = jwt.decode(token, secret, algorithms=["HS256"])
+    except jwt.PyJWTError:
+        return "anon"
+    return f"user:{payload['sub']}" if payload.get("sub") else "anon"
+
+
+def _route_scope(scope) -> str:
+    route_scope = f"POST {scope['path']} {_caller(scope)}"
+    if len(route_scope) > MAX_SCOPE_LENGTH:
+        # Paths longos (ids inválidos, rotas inexistentes) não cabem na coluna.
+        route_scope = "sha256:" + hashlib.sha256(route_scope.encode()).hexdigest()
+    return route_scope
+
+
+def _match_route(scope) -> None:
+    # Respostas dadas aqui não passam pelo roteamento; preenche scope["route"]
+    # para o MetricsMiddleware registrar o template e não "unmatched".
+    router = getattr(scope.get("app"), "router", None)
+    for route in getattr(router, "routes", ()):
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            scope.update(child_scope)
+            return
+
+
+def _stored(row: Row) -> StoredResponse:
+    return StoredResponse(
+        row.request_hash, row.status_code, row.headers or [], row.body or b"", row.expires_at.timestamp()
+    )
+
+
+def reserve(target: Engine, key: str, scope: str, request_hash: bytes) -> Optional[Row]:
+    """Reserva a chave; devolve None se ganhou, ou a linha já existente."""
+    now = datetime.now(timezone.utc)
+    stmt = insert(IdempotencyKey).values(
+        key=key, scope=scope, request_hash=request_hash, expires_at=now + timedelta(seconds=LOCK_SECONDS)
+    )
+    # Reaproveita no mesmo comando linhas expiradas (TTL vencido ou reserva órfã).
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.key, IdempotencyKey.scope],
+        set_={
+            "request_hash": stmt.excluded.request_hash,
+            "status_code": None,
+            "headers": None,
+            "body": None,
+            "created_at": func.now(),
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=IdempotencyKey.expires_at < func.now(),
+    ).returning(IdempotencyKey.key)
+    # Dois passes: a linha existente pode expirar e sumir entre os comandos.
+    for _ in range(2):
+        with target.begin() as conn:
+            if conn.execute(stmt).first() is not None:
+                return None
+            row = conn.execute(
+                select(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.scope == scope)
+            ).first()
+        if row is not None:
+            return row
+    raise RuntimeError(f"Não foi possível reservar a Idempotency-Key {key!r}")
+
+
+def complete(
+    target: Engine, key: str, scope: str, status_code: int, headers: list[list[str]], body: bytes
+) -> datetime:
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=TTL_SECONDS)
+    with target.begin() as conn:
+        conn.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.key == key, IdempotencyKey.scope == scope)
+            .values(status_code=status_code, headers=headers, body=body, expires_at=expires_at)
+        )
+    return expires_at
+
+
+def release(target: Engine, key: str, scope: str) -> None:
+    with target.begin() as conn:
+        conn.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.key == key,
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.status_code.is_(None),
+            )
+        )
+
+
+def purge_expired(target: Engine) -> int:
+    with target.begin() as conn:
+        return conn.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < func.now())).rowcount
+
+
+async def idempotency_purge_loop(target: Engine) -> None:
+    while True:
+        try:
+            purged = await run_in_threadpool(purge_expired, target)
+            if purged:
+                logger.info("Chaves de idempotência expiradas removidas: %s", purged)
+        except Exception:
+            logger.exception("Falha ao remover chaves de idempotência expiradas")
+        await asyncio.sleep(PURGE_INTERVAL_SECONDS)
+
+
+async def _send_json(send, status_code: int, body: bytes, extra_headers=()) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *extra_headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send, stored: StoredResponse) -> None:
+    headers = [(b"content-length", str(len(stored.body)).encode()), (b"idempotent-replayed", b"true")]
+    headers.extend((name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers)
+    await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": stored.body})
+
+
+class IdempotencyMiddleware:
+    # POST com Idempotency-Key: a primeira requisição reserva a chave e tem a
+    # resposta guardada; as repetições recebem a mesma resposta sem chegar às
+    # rotas. Duplicatas simultâneas levam 409 enquanto a primeira não termina.
+    # Respostas 5xx não são guardadas, para o cliente poder tentar de novo.
+    # A chave vale por rota e por usuário autenticado.
+
+    def __init__(self, app, target: Engine = engine):
+        self.app = app
+        self.target = target
+        self.cache = ResponseCache(CACHE_SIZE)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"].startswith(EXCLUDED_PREFIXES)
+        ):
+            await self.app(scope, receive, send)
+            return
+        raw_key = next((value for name, value in scope["headers"] if name == HEADER), None)
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, _INVALID)
+            return
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+
+        route_scope = _route_scope(scope)
+        cache_key = (key, route_scope)
+        request_hash = _request_hash(scope, body)
+
+        _match_route(scope)
+        stored = self.cache.get(cache_key)
+        if stored is None:
+            existing = await run_in_threadpool(reserve, self.target, key, route_scope, request_hash)
+            if existing is not None:
+                if existing.request_hash != request_hash:
+                    REQUESTS.labels("mismatch").inc()
+                    await _send_json(send, 422, _MISMATCH)
+                    return
+                if existing.status_code is None:
+                    REQUESTS.labels("in_progress").inc()
+                    await _send_json(send, 409, _IN_PROGRESS, [(b"retry-after", b"1")])
+                    return
+                stored = _stored(existing)
+                self.cache.put(cache_key, stored)
+
+        if stored is not None:
+            if stored.request_hash != request_hash:
+                REQUESTS.labels("mismatch").inc()
+                await _send_json(send, 422, _MISMATCH)
+                return
+            REQUESTS.labels("replayed").inc()
+            await _replay(send, stored)
+            return
+
+        await self._first_request(scope, receive, send, body, key, route_scope, request_hash)
+
+    async def _first_request(self, scope, receive, send, body, key, route_scope, request_hash):
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        headers = []
+        response_chunks = []
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() not in _SKIPPED_HEADERS:
+                        headers.append([name.decode("latin-1").lower(), value.decode("latin-1")])
+            elif message["type"] == "http.response.body":
+                response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, send_wrapper)
+        except Exception:
+            await run_in_threadpool(release, self.target, key, route_scope)
+            raise
+
+        if status_code >= 500:
+            await run_in_threadpool(release, self.target, key, route_scope)
+            return
+        response_body = b"".join(response_chunks)
+        expires_at = await run_in_threadpool(
+            complete, self.target, key, route_scope, status_code, headers, response_body
+        )
+        REQUESTS.labels("stored").inc()
+        self.cache.put(
+            (key, route_scope),
+            StoredResponse(request_hash, status_code, headers, response_body, expires_at.timestamp()),
+        )
@@ -1,15 +1,37 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.db import ensure_schema
+from app.db import DATABASE_READ_URL, engine
+from app.events import hub
+from app.idempotency import IdempotencyMiddleware, idempotency_purge_loop
+from app.metrics import MetricsMiddleware
+from app.metrics import router as metrics_router
+from app.migrations import check_schema
+from app.partitions import partition_maintenance_loop
+from app.profiling import PROFILING_ENABLED, install_profiling
+from app.replica import ReadYourWritesMiddleware
 from app.routers import auth_magic, projects
 
-app = FastAPI(title="Zenbild API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(check_schema)
+    maintenance = [
+        asyncio.create_task(partition_maintenance_loop(engine)),
+        asyncio.create_task(idempotency_purge_loop(engine)),
+    ]
+    yield
+    for task in maintenance:
+        task.cancel()
+    await hub.close()
 
 
-ensure_schema()
+app = FastAPI(title="Zenbild API", lifespan=lifespan)
 
 
 def _normalize_origin(origin: str) -> str:
@@ -32,15 +54,25 @@ def _resolve_cors_origins() -> list[str]:
     ]
 
 
+# A mais interna: respostas repetidas ainda passam por CORS, métricas e réplica.
+app.add_middleware(IdempotencyMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=_resolve_cors_origins(),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "Idempotent-Replayed"],
 )
+if DATABASE_READ_URL:
+    app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.include_router(auth_magic.router)
 app.include_router(projects.router)
+app.include_router(metrics_router)
+
+if PROFILING_ENABLED:
+    install_profiling(app)
 
 @app.get("/health")
 def health():
@@ -0,0 +1,178 @@
+import logging
+import os
+import secrets
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import Engine, event
+from sqlalchemy.pool import QueuePool
+
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+
+slow_query_logger = logging.getLogger("app.db.slow")
+
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Espera por uma conexão do pool (fila ou abertura de conexão nova)",
+    ["engine"],
+)
+POOL_CONNECT_SECONDS = Histogram(
+    "db_pool_connect_seconds",
+    "Checkout completo, incluindo pre_ping",
+    ["engine"],
+)
+QUERY_SECONDS = Histogram("db_query_seconds", "Duração das consultas", ["engine"])
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Latência das requisições por rota",
+    ["method", "route", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Consultas ao banco por requisição",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Tempo de banco por requisição",
+    ["method", "route"],
+)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+# Compartilhado com as threads do threadpool (o contexto é copiado, o objeto não).
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _pool_label(pool) -> str:
+    return pool._orig_logging_name or "primary"
+
+
+class TimedQueuePool(QueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_SECONDS.labels(_pool_label(self)).observe(time.perf_counter() - start)
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            POOL_CONNECT_SECONDS.labels(_pool_label(self)).observe(time.perf_counter() - start)
+
+
+class _PoolCollector:
+    def __init__(self):
+        self.engines: dict[str, Engine] = {}
+
+    def collect(self):
+        size = GaugeMetricFamily("db_pool_size", "Tamanho configurado do pool", labels=["engine"])
+        checked_out = GaugeMetricFamily("db_pool_checked_out", "Conexões em uso", labels=["engine"])
+        checked_in = GaugeMetricFamily("db_pool_checked_in", "Conexões ociosas no pool", labels=["engine"])
+        overflow = GaugeMetricFamily("db_pool_overflow", "Conexões além de pool_size", labels=["engine"])
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            if not isinstance(pool, QueuePool):
+                continue
+            size.add_metric([name], pool.size())
+            checked_out.add_metric([name], pool.checkedout())
+            checked_in.add_metric([name], pool.checkedin())
+            overflow.add_metric([name], max(pool.overflow(), 0))
+        yield from (size, checked_out, checked_in, overflow)
+
+
+_pool_collector = _PoolCollector()
+REGISTRY.register(_pool_collector)
+
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    _pool_collector.engines[name] = engine
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        QUERY_SECONDS.labels(name).observe(elapsed)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            slow_query_logger.warning(
+                "Consulta lenta em %s (%.0f ms): %s", name, elapsed * 1000, statement
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            # Template da rota (não o path bruto) para manter a cardinalidade baixa.
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_SECONDS.labels(method, route_path, str(status_code)).observe(
+                time.perf_counter() - start
+            )
+            REQUEST_QUERIES.labels(method, route_path).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(method, route_path).observe(stats.db_seconds)
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(request: Request):
+    # Fechado por padrão: sem METRICS_TOKEN a rota nem aparece na API pública.
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    provided = request.headers.get("authorization", "").encode()
+    if not secrets.compare_digest(provided, f"Bearer {token}".encode()):
+        raise HTTPException(status_code=401, detail="Não autorizado")
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
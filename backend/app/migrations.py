@@ -0,0 +1,347 @@
+import logging
+import os
+from datetime import timezone
+
+from sqlalchemy import Connection, Engine, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.db import engine
+from app.partitions import ensure_message_partitions
+
+logger = logging.getLogger(__name__)
+
+AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+# Chave arbitrária para pg_advisory_xact_lock: serializa workers subindo juntos.
+_LOCK_KEY = 7_301_202_501
+
+
+# DDL congelada: cada migração cria os próprios objetos como eram quando foi
+# escrita, independentemente dos modelos atuais. IF NOT EXISTS no baseline
+# cobre bancos criados pelo antigo create_all no import.
+_BASELINE_DDL = [
+    """CREATE TABLE IF NOT EXISTS email_login_tokens (
+        id SERIAL NOT NULL,
+        email VARCHAR NOT NULL,
+        token_hash VARCHAR NOT NULL,
+        user_id UUID,
+        ip VARCHAR,
+        user_agent VARCHAR,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        consumed_at TIMESTAMP WITH TIME ZONE,
+        PRIMARY KEY (id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_email_login_tokens_email ON email_login_tokens (email)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_email_login_tokens_token_hash ON email_login_tokens (token_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_email_login_tokens_user_id ON email_login_tokens (user_id)",
+    """CREATE TABLE IF NOT EXISTS projects (
+        id UUID NOT NULL,
+        title VARCHAR(255) NOT NULL,
+        address VARCHAR(255),
+        currency VARCHAR(8) NOT NULL,
+        owner_id UUID NOT NULL,
+        status VARCHAR(32) NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        version INTEGER DEFAULT '0' NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    "ALTER TABLE projects ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 0",
+    "CREATE INDEX IF NOT EXISTS ix_projects_owner_id ON projects (owner_id)",
+    """CREATE TABLE IF NOT EXISTS users (
+        id UUID NOT NULL,
+        email VARCHAR NOT NULL,
+        is_guest BOOLEAN NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (id)
+    )""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+    """CREATE TABLE IF NOT EXISTS daily_logs (
+        id UUID NOT NULL,
+        project_id UUID NOT NULL,
+        date DATE NOT NULL,
+        summary_text TEXT,
+        score_schedule INTEGER NOT NULL,
+        score_budget INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT score_schedule_range CHECK (score_schedule BETWEEN 0 AND 100),
+        CONSTRAINT score_budget_range CHECK (score_budget BETWEEN 0 AND 100),
+        FOREIGN KEY(project_id) REFERENCES projects (id) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_daily_logs_date ON daily_logs (date)",
+    "CREATE INDEX IF NOT EXISTS ix_daily_logs_project_date ON daily_logs (project_id, date DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_daily_logs_project_id ON daily_logs (project_id)",
+    """CREATE TABLE IF NOT EXISTS milestones (
+        id UUID NOT NULL,
+        project_id UUID NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        amount NUMERIC(12, 2),
+        criteria TEXT,
+        status VARCHAR(16) NOT NULL,
+        due_date DATE,
+        PRIMARY KEY (id),
+        FOREIGN KEY(project_id) REFERENCES projects (id) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_milestones_project_id ON milestones (project_id)",
+    "CREATE INDEX IF NOT EXISTS ix_milestones_project_pending_due "
+    "ON milestones (project_id, due_date) WHERE status = 'pending'",
+    """CREATE TABLE IF NOT EXISTS participants (
+        id UUID NOT NULL,
+        project_id UUID NOT NULL,
+        role VARCHAR(100) NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        phone VARCHAR(50),
+        can_post BOOLEAN NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(project_id) REFERENCES projects (id) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_participants_project_id ON participants (project_id)",
+    """CREATE TABLE IF NOT EXISTS messages (
+        id UUID NOT NULL,
+        project_id UUID NOT NULL,
+        sender_id UUID,
+        type VARCHAR(16) NOT NULL,
+        url VARCHAR(2048),
+        transcript TEXT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(project_id) REFERENCES projects (id) ON DELETE CASCADE,
+        FOREIGN KEY(sender_id) REFERENCES participants (id) ON DELETE SET NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_messages_created_at ON messages (created_at)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_project_created_at ON messages (project_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_messages_project_id ON messages (project_id)",
+    """CREATE TABLE IF NOT EXISTS payments (
+        id UUID NOT NULL,
+        milestone_id UUID NOT NULL,
+        provider VARCHAR(20) NOT NULL,
+        link VARCHAR(2048),
+        status VARCHAR(20) NOT NULL,
+        paid_at TIMESTAMP WITH TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY(milestone_id) REFERENCES milestones (id) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_payments_milestone_id ON payments (milestone_id)",
+    "CREATE INDEX IF NOT EXISTS ix_payments_milestone_pending ON payments (milestone_id) WHERE status = 'pending'",
+    """CREATE TABLE IF NOT EXISTS annotations (
+        id UUID NOT NULL,
+        message_id UUID NOT NULL,
+        area VARCHAR(255),
+        task VARCHAR(255),
+        phase VARCHAR(255),
+        percent_complete INTEGER,
+        blocker TEXT,
+        next_step TEXT,
+        confidence INTEGER,
+        PRIMARY KEY (id),
+        CONSTRAINT percent_complete_range CHECK (percent_complete BETWEEN 0 AND 100),
+        CONSTRAINT confidence_range CHECK (confidence BETWEEN 0 AND 100),
+        FOREIGN KEY(message_id) REFERENCES messages (id) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_annotations_message_id ON annotations (message_id)",
+]
+
+_MESSAGE_ARCHIVES_DDL = [
+    """CREATE TABLE IF NOT EXISTS message_archives (
+        id UUID NOT NULL,
+        project_id UUID NOT NULL,
+        month DATE NOT NULL,
+        bucket VARCHAR(255) NOT NULL,
+        messages_key VARCHAR(1024) NOT NULL,
+        annotations_key VARCHAR(1024) NOT NULL,
+        message_count INTEGER NOT NULL,
+        annotation_count INTEGER NOT NULL,
+        archived_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        restored_at TIMESTAMP WITH TIME ZONE,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_message_archives_project_month UNIQUE (project_id, month),
+        FOREIGN KEY(project_id) REFERENCES projects (id) ON DELETE CASCADE
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_message_archives_project_id ON message_archives (project_id)",
+]
+
+_PARTITIONED_MESSAGES_DDL = [
+    """CREATE TABLE messages (
+        id UUID NOT NULL,
+        project_id UUID NOT NULL,
+        sender_id UUID,
+        type VARCHAR(16) NOT NULL,
+        url VARCHAR(2048),
+        transcript TEXT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (id, created_at),
+        FOREIGN KEY(project_id) REFERENCES projects (id) ON DELETE CASCADE,
+        FOREIGN KEY(sender_id) REFERENCES participants (id) ON DELETE SET NULL
+    ) PARTITION BY RANGE (created_at)""",
+    "CREATE INDEX ix_messages_created_at ON messages (created_at)",
+    "CREATE INDEX ix_messages_project_created_at ON messages (project_id, created_at DESC)",
+    "CREATE INDEX ix_messages_project_id ON messages (project_id)",
+]
+
+_IDEMPOTENCY_KEYS_DDL = [
+    """CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key VARCHAR(255) NOT NULL,
+        scope VARCHAR(255) NOT NULL,
+        request_hash BYTEA NOT NULL,
+        status_code INTEGER,
+        content_type VARCHAR(255),
+        body BYTEA,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+        expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+        PRIMARY KEY (key, scope)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at ON idempotency_keys (expires_at)",
+]
+
+
+def _execute(conn: Connection, statements: list[str]) -> None:
+    for statement in statements:
+        conn.exec_driver_sql(statement)
+
+
+def _baseline(conn: Connection) -> None:
+    _execute(conn, _BASELINE_DDL)
+
+
+def _partition_messages(conn: Connection) -> None:
+    _execute(conn, _MESSAGE_ARCHIVES_DDL)
+    partitioned = conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'messages'::regclass)")
+    ).scalar()
+    if partitioned:
+        # Bancos criados enquanto o baseline ainda usava create_all com os
+        # modelos atuais: messages já nasceu particionada.
+        ensure_message_partitions(conn)
+        return
+
+    conn.exec_driver_sql("ALTER TABLE annotations DROP CONSTRAINT IF EXISTS annotations_message_id_fkey")
+    conn.exec_driver_sql("ALTER TABLE messages RENAME TO messages_legacy")
+    conn.exec_driver_sql("ALTER TABLE messages_legacy RENAME CONSTRAINT messages_pkey TO messages_legacy_pkey")
+    legacy_indexes = conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = 'messages_legacy' AND indexname LIKE 'ix_messages_%'")
+    ).scalars()
+    for index_name in list(legacy_indexes):
+        conn.exec_driver_sql(f"ALTER INDEX {index_name} RENAME TO {index_name}_legacy")
+
+    _execute(conn, _PARTITIONED_MESSAGES_DDL)
+    oldest = conn.execute(text("SELECT min(created_at) FROM messages_legacy")).scalar()
+    ensure_message_partitions(conn, start=oldest.astimezone(timezone.utc).date() if oldest else None)
+    conn.exec_driver_sql(
+        "INSERT INTO messages (id, project_id, sender_id, type, url, transcript, created_at) "
+        "SELECT id, project_id, sender_id, type, url, transcript, created_at FROM messages_legacy"
+    )
+
+    conn.exec_driver_sql("ALTER TABLE annotations ADD COLUMN IF NOT EXISTS message_created_at timestamptz")
+    conn.exec_driver_sql(
+        "UPDATE annotations a SET message_created_at = m.created_at "
+        "FROM messages_legacy m WHERE m.id = a.message_id"
+    )
+    conn.exec_driver_sql("ALTER TABLE annotations ALTER COLUMN message_created_at SET NOT NULL")
+    conn.exec_driver_sql(
+        "ALTER TABLE annotations ADD CONSTRAINT fk_annotations_message "
+        "FOREIGN KEY (message_id, message_created_at) REFERENCES messages (id, created_at) ON DELETE CASCADE"
+    )
+    conn.exec_driver_sql("DROP TABLE messages_legacy")
+
+
+def _idempotency_keys(conn: Connection) -> None:
+    _execute(conn, _IDEMPOTENCY_KEYS_DDL)
+
+
+def _project_last_message_at(conn: Connection) -> None:
+    # Backfill por projeto: cada max() é uma descida de índice por partição,
+    # sem varrer messages inteira.
+    _execute(
+        conn,
+        [
+            "ALTER TABLE projects ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMP WITH TIME ZONE",
+            "UPDATE projects p SET last_message_at = "
+            "(SELECT max(m.created_at) FROM messages m WHERE m.project_id = p.id)",
+        ],
+    )
+
+
+def _idempotency_headers(conn: Connection) -> None:
+    # As linhas antigas usam o escopo sem usuário e só expiram; não há o que
+    # converter.
+    _execute(
+        conn,
+        [
+            "ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS headers JSONB",
+            "ALTER TABLE idempotency_keys DROP COLUMN IF EXISTS content_type",
+        ],
+    )
+
+
+# Somente acrescente no fim; nunca altere uma migração já aplicada.
+MIGRATIONS = [
+    (1, "esquema inicial", _baseline),
+    (2, "messages particionada por mês e arquivamento", _partition_messages),
+    (3, "idempotency_keys", _idempotency_keys),
+    (4, "projects.last_message_at", _project_last_message_at),
+    (5, "idempotency_keys.headers", _idempotency_headers),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+# Reescrevem tabelas grandes sob ACCESS EXCLUSIVE: nunca rodam no boot da API
+# (DB_AUTO_MIGRATE), só por python -m app.migrations numa janela combinada.
+MANUAL_MIGRATIONS = {2}
+
+
+def current_version(conn: Connection) -> int:
+    try:
+        return conn.execute(text("SELECT max(version) FROM schema_version")).scalar() or 0
+    except ProgrammingError:
+        conn.rollback()
+        return 0
+
+
+def migrate(target: Engine = engine) -> int:
+    with target.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+        conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version integer PRIMARY KEY, "
+            "description text NOT NULL, "
+            "applied_at timestamptz NOT NULL DEFAULT now())"
+        )
+        version = current_version(conn)
+        for number, description, apply in MIGRATIONS:
+            if number <= version:
+                continue
+            logger.info("Aplicando migração %s: %s", number, description)
+            apply(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description) VALUES (:version, :description)"),
+                {"version": number, "description": description},
+            )
+            version = number
+    return version
+
+
+def check_schema(target: Engine = engine) -> None:
+    # Uma única consulta no caso comum; não bloqueia o boot se o banco estiver fora.
+    try:
+        with target.connect() as conn:
+            version = current_version(conn)
+    except OperationalError:
+        logger.warning("Banco indisponível na inicialização; versão do esquema não verificada")
+        return
+
+    if version == LATEST_VERSION:
+        return
+    if version > LATEST_VERSION:
+        logger.warning("Esquema na versão %s, mais nova que a do código (%s)", version, LATEST_VERSION)
+        return
+    manual = sorted(number for number in MANUAL_MIGRATIONS if number > version)
+    if not AUTO_MIGRATE or manual:
+        reason = f" (migração {', '.join(map(str, manual))} não roda no boot)" if manual else ""
+        raise RuntimeError(
+            f"Esquema na versão {version}, esperado {LATEST_VERSION}{reason}; rode python -m app.migrations"
+        )
+    migrate(target)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"esquema na versão {migrate()}")
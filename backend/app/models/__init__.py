@@ -1,4 +1,6 @@
 from .user import EmailLoginToken, User
+from .archive import MessageArchive
+from .idempotency import IdempotencyKey
 from .project import (
     Annotation,
     DailyLog,
@@ -18,7 +20,9 @@ __all__ = [
     "Annotation",
     "DailyLog",
     "EmailLoginToken",
+    "IdempotencyKey",
     "Message",
+    "MessageArchive",
     "MessageType",
     "Milestone",
     "MilestoneStatus",
@@ -0,0 +1,35 @@
+import uuid
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import Date, DateTime, ForeignKey, Integer, String, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class MessageArchive(Base):
+    # Um mês de mensagens (e anotações) de um projeto movido para o S3.
+    __tablename__ = "message_archives"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    project_id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True), ForeignKey("projects.id", ondelete="CASCADE"), index=True
+    )
+    month: Mapped[date] = mapped_column(Date)
+    bucket: Mapped[str] = mapped_column(String(255))
+    messages_key: Mapped[str] = mapped_column(String(1024))
+    annotations_key: Mapped[str] = mapped_column(String(1024))
+    message_count: Mapped[int] = mapped_column(Integer)
+    annotation_count: Mapped[int] = mapped_column(Integer)
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    restored_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    __table_args__ = (UniqueConstraint("project_id", "month", name="uq_message_archives_project_month"),)
@@ -1,5 +1,5 @@
 import uuid
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 from enum import Enum
 from typing import Optional
 
@@ -9,6 +9,9 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    ForeignKeyConstraint,
+    Index,
+    Integer,
     Numeric,
     String,
     Text,
@@ -43,6 +46,12 @@ class Project(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+    # Incrementado a cada escrita no projeto ou em seus filhos (ETag).
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Desnormalizado: evita varrer todas as partições de messages atrás do máximo.
+    last_message_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
 
 
 class Participant(Base):
@@ -69,7 +78,13 @@ class MessageType(str, Enum):
     IMAGE = "image"
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Message(Base):
+    # Particionada por mês em created_at (ver app/partitions.py); por isso a
+    # chave primária inclui created_at.
     __tablename__ = "messages"
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -85,7 +100,17 @@ class Message(Base):
     url: Mapped[Optional[str]] = mapped_column(String(2048), nullable=True)
     transcript: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), index=True
+        DateTime(timezone=True),
+        primary_key=True,
+        default=_utcnow,
+        server_default=func.now(),
+        index=True,
+    )
+
+    __table_args__ = (
+        # Última mensagem por projeto (portfolio/timeline).
+        Index("ix_messages_project_created_at", "project_id", created_at.desc()),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
 
@@ -95,9 +120,9 @@ class Annotation(Base):
     id: Mapped[uuid.UUID] = mapped_column(
         PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
-    message_id: Mapped[uuid.UUID] = mapped_column(
-        PGUUID(as_uuid=True), ForeignKey("messages.id", ondelete="CASCADE"), index=True
-    )
+    message_id: Mapped[uuid.UUID] = mapped_column(PGUUID(as_uuid=True), index=True)
+    # Parte da chave de messages particionada; também permite o pruning.
+    message_created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
     area: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     task: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     phase: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
@@ -107,6 +132,12 @@ class Annotation(Base):
     confidence: Mapped[Optional[int]] = mapped_column(nullable=True)
 
     __table_args__ = (
+        ForeignKeyConstraint(
+            ["message_id", "message_created_at"],
+            ["messages.id", "messages.created_at"],
+            ondelete="CASCADE",
+            name="fk_annotations_message",
+        ),
         CheckConstraint(
             "percent_complete BETWEEN 0 AND 100",
             name="percent_complete_range",
@@ -135,6 +166,8 @@ class DailyLog(Base):
     __table_args__ = (
         CheckConstraint("score_schedule BETWEEN 0 AND 100", name="score_schedule_range"),
         CheckConstraint("score_budget BETWEEN 0 AND 100", name="score_budget_range"),
+        # Último registro diário por projeto (portfolio).
+        Index("ix_daily_logs_project_date", "project_id", date.desc()),
     )
 
 
@@ -159,6 +192,16 @@ class Milestone(Base):
     status: Mapped[str] = mapped_column(String(16), default=MilestoneStatus.PENDING.value)
     due_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
 
+    __table_args__ = (
+        # Próximo marco pendente por projeto (portfolio).
+        Index(
+            "ix_milestones_project_pending_due",
+            "project_id",
+            "due_date",
+            postgresql_where=status == MilestoneStatus.PENDING.value,
+        ),
+    )
+
 
 class PaymentProvider(str, Enum):
     STRIPE = "stripe"
@@ -187,3 +230,12 @@ class Payment(Base):
     link: Mapped[Optional[str]] = mapped_column(String(2048), nullable=True)
     status: Mapped[str] = mapped_column(String(20), default=PaymentStatus.PENDING.value)
     paid_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Pagamentos em aberto por marco (portfolio).
+        Index(
+            "ix_payments_milestone_pending",
+            "milestone_id",
+            postgresql_where=status == PaymentStatus.PENDING.value,
+        ),
+    )
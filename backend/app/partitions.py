@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Connection, Engine, text
+
+logger = logging.getLogger(__name__)
+
+MONTHS_AHEAD = int(os.getenv("MESSAGE_PARTITION_MONTHS_AHEAD", "3"))
+CHECK_INTERVAL_SECONDS = float(os.getenv("MESSAGE_PARTITION_CHECK_SECONDS", str(6 * 60 * 60)))
+DEFAULT_PARTITION = "messages_default"
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"messages_p{month:%Y_%m}"
+
+
+def existing_partitions(conn: Connection) -> set[str]:
+    rows = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'messages'::regclass"
+        )
+    )
+    return {row[0] for row in rows}
+
+
+def ensure_message_partitions(
+    conn: Connection, start: Optional[date] = None, months_ahead: int = MONTHS_AHEAD
+) -> list[str]:
+    # Uma consulta quando tudo já existe. A partição default só recebe linhas
+    # fora das faixas criadas (ex.: importações com datas antigas); como os
+    # meses futuros são criados com antecedência, ela nunca cobre um mês novo.
+    today = datetime.now(timezone.utc).date()
+    first = month_start(start or today)
+    last = add_months(month_start(today), months_ahead)
+    existing = existing_partitions(conn)
+    created = []
+
+    month = first
+    while month <= last:
+        name = partition_name(month)
+        upper = add_months(month, 1)
+        if name not in existing:
+            conn.exec_driver_sql(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF messages "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+            )
+            created.append(name)
+        month = upper
+
+    if DEFAULT_PARTITION not in existing:
+        conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF messages DEFAULT")
+        created.append(DEFAULT_PARTITION)
+    if created:
+        logger.info("Partições de messages criadas: %s", ", ".join(created))
+    return created
+
+
+def maintain_partitions(target: Engine) -> list[str]:
+    with target.begin() as conn:
+        return ensure_message_partitions(conn)
+
+
+async def partition_maintenance_loop(target: Engine) -> None:
+    # Roda fora do caminho do boot; workers de vida longa seguem criando os
+    # meses seguintes.
+    while True:
+        try:
+            await run_in_threadpool(maintain_partitions, target)
+        except Exception:
+            logger.exception("Falha ao criar partições de messages")
+        await asyncio.sleep(CHECK_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    from app.db import engine
+
+    logging.basicConfig(level=logging.INFO)
+    maintain_partitions(engine)
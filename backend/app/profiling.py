@@ -0,0 +1,291 @@
+import functools
+import inspect
+import json
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI, HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+SECRET = os.getenv("PROFILING_SECRET")
+INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+MAX_STACKS_PER_ROUTE = int(os.getenv("PROFILING_MAX_STACKS_PER_ROUTE", "5000"))
+HEADER = "x-zenbild-profile"
+
+
+class _ProfiledRequest:
+    __slots__ = ("threads", "stacks")
+
+    def __init__(self):
+        self.threads: set[int] = set()
+        self.stacks: Counter[str] = Counter()
+
+
+_active: ContextVar[Optional[_ProfiledRequest]] = ContextVar("profiled_request", default=None)
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for marker in ("site-packages/", "backend/"):
+        index = filename.rfind(marker)
+        if index != -1:
+            filename = filename[index + len(marker):]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class Sampler:
+    # Amostra via sys._current_frames() só as threads que estão executando
+    # requisições sorteadas; sem requisições ativas a thread fica parada.
+
+    def __init__(self, interval_ms: float):
+        self._interval = interval_ms / 1000
+        self._lock = threading.Lock()
+        self._requests: set[_ProfiledRequest] = set()
+        self._has_work = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.routes: dict[str, Counter[str]] = defaultdict(Counter)
+
+    @property
+    def interval_ms(self) -> float:
+        return self._interval * 1000
+
+    def start(self, request: _ProfiledRequest) -> None:
+        with self._lock:
+            self._requests.add(request)
+            self._has_work.set()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self, request: _ProfiledRequest, route: str) -> None:
+        with self._lock:
+            self._requests.discard(request)
+            if not self._requests:
+                self._has_work.clear()
+            stacks = self.routes[route]
+            for stack, count in request.stacks.items():
+                if stack in stacks or len(stacks) < MAX_STACKS_PER_ROUTE:
+                    stacks[stack] += count
+
+    def reset(self) -> None:
+        with self._lock:
+            self.routes.clear()
+
+    def totals(self) -> dict[str, int]:
+        with self._lock:
+            return {route: sum(stacks.values()) for route, stacks in self.routes.items()}
+
+    def route_stacks(self, route: str) -> Counter[str]:
+        # Cópia feita sob o lock: stop() pode estar somando na mesma rota.
+        with self._lock:
+            return Counter(self.routes.get(route, ()))
+
+    def _run(self) -> None:
+        while True:
+            self._has_work.wait()
+            time.sleep(self._interval)
+            with self._lock:
+                requests = list(self._requests)
+            if not requests:
+                continue
+            frames = sys._current_frames()
+            tick: Counter[tuple[_ProfiledRequest, str]] = Counter()
+            for request in requests:
+                for thread_id in list(request.threads):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        tick[request, _collapse(frame)] += 1
+            del frames
+            # Soma sob o lock, que é o mesmo de stop(): uma requisição já
+            # encerrada não recebe amostras enquanto stop() itera as dela.
+            with self._lock:
+                for (request, stack), count in tick.items():
+                    if request in self._requests:
+                        request.stacks[stack] += count
+
+
+sampler = Sampler(INTERVAL_MS)
+
+
+def _header_matches(value: Optional[str]) -> bool:
+    if not SECRET or not value:
+        return False
+    return secrets.compare_digest(value.encode(), SECRET.encode())
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        if scope["path"].startswith("/admin/profiles"):
+            return False
+        for name, value in scope["headers"]:
+            if name == HEADER.encode():
+                return _header_matches(value.decode("latin-1"))
+        return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request = _ProfiledRequest()
+        token = _active.set(request)
+        sampler.start(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _active.reset(token)
+            route = scope.get("route")
+            sampler.stop(request, f"{scope['method']} {getattr(route, 'path', 'unmatched')}")
+
+
+def _attach_thread(call):
+    # Endpoints síncronos rodam no threadpool: registra a thread que de fato
+    # executa o endpoint. Nos assíncronos é a thread do event loop, então as
+    # amostras incluem outras corrotinas que rodarem no mesmo intervalo.
+    if inspect.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            request = _active.get()
+            if request is None:
+                return await call(*args, **kwargs)
+            thread_id = threading.get_ident()
+            request.threads.add(thread_id)
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                request.threads.discard(thread_id)
+
+        return async_wrapper
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        request = _active.get()
+        if request is None:
+            return call(*args, **kwargs)
+        thread_id = threading.get_ident()
+        request.threads.add(thread_id)
+        try:
+            return call(*args, **kwargs)
+        finally:
+            request.threads.discard(thread_id)
+
+    return wrapper
+
+
+def _speedscope(route: str, stacks: Counter[str]) -> dict:
+    frames: list[dict] = []
+    frame_index: dict[str, int] = {}
+    samples = []
+    weights = []
+    for stack, count in stacks.most_common():
+        indexes = []
+        for name in stack.split(";"):
+            if name not in frame_index:
+                frame_index[name] = len(frames)
+                frames.append({"name": name})
+            indexes.append(frame_index[name])
+        samples.append(indexes)
+        weights.append(count * sampler.interval_ms)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": route,
+        "exporter": "zenbild-api",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": route,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }
+        ],
+    }
+
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin"], include_in_schema=False)
+
+
+def _require_secret(request: Request) -> None:
+    if not _header_matches(request.headers.get(HEADER)):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+
+def _route_stacks(route: str) -> Counter[str]:
+    stacks = sampler.route_stacks(route)
+    if not stacks:
+        raise HTTPException(status_code=404, detail="Sem amostras para a rota")
+    return stacks
+
+
+@router.get("")
+def list_profiles(request: Request):
+    _require_secret(request)
+    return {
+        "interval_ms": sampler.interval_ms,
+        "routes": sampler.totals(),
+    }
+
+
+@router.get("/collapsed")
+def collapsed_profile(route: str, request: Request):
+    _require_secret(request)
+    stacks = _route_stacks(route)
+    body = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    return Response(
+        body,
+        media_type="text/plain",
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed.txt"'},
+    )
+
+
+@router.get("/speedscope")
+def speedscope_profile(route: str, request: Request):
+    _require_secret(request)
+    profile = _speedscope(route, _route_stacks(route))
+    return Response(
+        json.dumps(profile),
+        media_type="application/json",
+        headers={"Content-Disposition": 'attachment; filename="profile.speedscope.json"'},
+    )
+
+
+@router.delete("", status_code=204)
+def reset_profiles(request: Request):
+    _require_secret(request)
+    sampler.reset()
+
+
+def install_profiling(app: FastAPI) -> None:
+    # Chamado só com PROFILING_ENABLED: desligado, nenhuma camada é adicionada.
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.dependant.call is not None:
+            route.dependant.call = _attach_thread(route.dependant.call)
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware)
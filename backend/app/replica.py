@@ -0,0 +1,59 @@
+import os
+import time
+from http.cookies import SimpleCookie
+
+from starlette.datastructures import MutableHeaders
+
+from app.db import prefer_primary
+
+STICKY_SECONDS = int(os.getenv("DB_READ_STICKY_SECONDS", "5"))
+COOKIE_NAME = "zenbild_primary_until"
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def _sticky_until(scope) -> float:
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            cookie = SimpleCookie()
+            try:
+                cookie.load(value.decode("latin-1"))
+            except Exception:
+                return 0.0
+            morsel = cookie.get(COOKIE_NAME)
+            if morsel is not None:
+                try:
+                    return float(morsel.value)
+                except ValueError:
+                    return 0.0
+    return 0.0
+
+
+class ReadYourWritesMiddleware:
+    # Depois de uma escrita, o cliente lê do primário por STICKY_SECONDS
+    # (cookie, para valer entre workers) e não vê a réplica atrasada.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = prefer_primary.set(_sticky_until(scope) > time.time())
+        is_write = scope["method"] in _WRITE_METHODS
+
+        async def send_wrapper(message):
+            if is_write and message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time()) + STICKY_SECONDS
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{COOKIE_NAME}={until}; Max-Age={STICKY_SECONDS}; Path=/; HttpOnly; Secure; SameSite=Lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            prefer_primary.reset(token)
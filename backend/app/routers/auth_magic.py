@@ -5,7 +5,6 @@ import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-import httpx
 import jwt
 from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel, EmailStr
@@ -187,6 +186,8 @@ def rate_limit_ok(kind: str, key: str) -> bool:
     return True
 
 async def send_magic_email_resend(to_email: str, link: str):
+    import httpx  # carregado só quando um e-mail é enviado (boot mais rápido)
+
     api_key = os.getenv("RESEND_API_KEY")
     if not api_key:
         raise RuntimeError("RESEND_API_KEY ausente")
@@ -1,16 +1,31 @@
 import uuid
-from datetime import date, datetime
+from datetime import date, datetime, timedelta, timezone
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import select
+from sqlalchemy import func, select, true, tuple_, update
 from sqlalchemy.orm import Session
 
-from app.db import engine
+from app.archive import restore_project
+from app.db import engine, reader_engine
+from app.events import notify_project_event, sse_stream
+from app.export import (
+    MEDIA_TYPES,
+    ExportEntity,
+    ExportFormat,
+    csv_stream,
+    entity_statements,
+    ndjson_stream,
+    parquet_stream,
+)
+from app.http_cache import is_not_modified, make_etag, not_modified, set_cache_headers
 from app.models import (
     DailyLog,
     Message,
+    MessageArchive,
     MessageType,
     Milestone,
     MilestoneStatus,
@@ -21,9 +36,15 @@ from app.models import (
     Project,
     ProjectStatus,
 )
+from app.serialization import FastJSONResponse, rows_as_dicts
 
 router = APIRouter(prefix="/projects", tags=["projects"])
 
+TIMELINE_MAX_LIMIT = 10_000
+# Janela da primeira consulta da timeline: limita created_at e o planner só
+# visita as partições recentes; o resto é buscado só se a página não encher.
+TIMELINE_WINDOW = timedelta(days=31)
+
 
 class ProjectCreate(BaseModel):
     title: str
@@ -148,6 +169,28 @@ class PaymentRead(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class PortfolioDailyLog(BaseModel):
+    date: date
+    score_schedule: int
+    score_budget: int
+
+
+class PortfolioMilestone(BaseModel):
+    id: uuid.UUID
+    name: str
+    amount: Optional[float]
+    due_date: Optional[date]
+
+
+class PortfolioItem(BaseModel):
+    project: ProjectRead
+    latest_daily_log: Optional[PortfolioDailyLog]
+    next_milestone: Optional[PortfolioMilestone]
+    pending_payments: int
+    outstanding_amount: float
+    last_message_at: Optional[datetime]
+
+
 def _get_project(session: Session, project_id: uuid.UUID) -> Project:
     stmt = select(Project).where(Project.id == project_id)
     project = session.scalars(stmt).first()
@@ -156,6 +199,18 @@ def _get_project(session: Session, project_id: uuid.UUID) -> Project:
     return project
 
 
+def _touch_project(
+    session: Session, project_id: uuid.UUID, last_message_at: Optional[datetime] = None
+) -> None:
+    # Valida a existência e incrementa a versão (ETag) numa única ida ao banco.
+    values = {"version": Project.version + 1}
+    if last_message_at is not None:
+        values["last_message_at"] = func.greatest(Project.last_message_at, last_message_at)
+    stmt = update(Project).where(Project.id == project_id).values(**values).returning(Project.id)
+    if session.execute(stmt).first() is None:
+        raise HTTPException(status_code=404, detail="Projeto não encontrado")
+
+
 def _get_participant(session: Session, participant_id: uuid.UUID, project_id: uuid.UUID) -> Participant:
     stmt = select(Participant).where(
         Participant.id == participant_id, Participant.project_id == project_id
@@ -166,6 +221,314 @@ def _get_participant(session: Session, participant_id: uuid.UUID, project_id: uu
     return participant
 
 
+def _read_columns(model, schema: type[BaseModel]) -> list:
+    # Colunas na ordem dos campos do schema: as tuplas viram JSON direto,
+    # sem entidades ORM nem instâncias Pydantic (caminho das listas grandes).
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+_PROJECT_COLUMNS = _read_columns(Project, ProjectRead)
+_MESSAGE_COLUMNS = _read_columns(Message, MessageRead)
+
+
+def _portfolio_statement(owner_id: uuid.UUID):
+    # Uma única consulta: cada resumo por projeto é um LATERAL apoiado por um
+    # índice (project_id, ...), evitando 4 consultas por projeto.
+    latest_log = (
+        select(DailyLog.date, DailyLog.score_schedule, DailyLog.score_budget)
+        .where(DailyLog.project_id == Project.id)
+        .order_by(DailyLog.date.desc())
+        .limit(1)
+        .lateral("latest_log")
+    )
+    next_milestone = (
+        select(Milestone.id, Milestone.name, Milestone.amount, Milestone.due_date)
+        .where(
+            Milestone.project_id == Project.id,
+            Milestone.status == MilestoneStatus.PENDING.value,
+        )
+        .order_by(Milestone.due_date.asc().nulls_last(), Milestone.name)
+        .limit(1)
+        .lateral("next_milestone")
+    )
+    pending_payments = (
+        select(func.count(Payment.id).label("pending_payments"))
+        .select_from(Payment)
+        .join(Milestone, Milestone.id == Payment.milestone_id)
+        .where(
+            Milestone.project_id == Project.id,
+            Payment.status == PaymentStatus.PENDING.value,
+        )
+        .lateral("pending_payments")
+    )
+    # Cada marco entra uma vez, mesmo com vários links de pagamento pendentes.
+    outstanding = (
+        select(func.coalesce(func.sum(Milestone.amount), 0).label("outstanding_amount"))
+        .where(
+            Milestone.project_id == Project.id,
+            select(Payment.id)
+            .where(
+                Payment.milestone_id == Milestone.id,
+                Payment.status == PaymentStatus.PENDING.value,
+            )
+            .exists(),
+        )
+        .lateral("outstanding")
+    )
+    return (
+        select(
+            *_PROJECT_COLUMNS,
+            latest_log.c.date.label("log_date"),
+            latest_log.c.score_schedule,
+            latest_log.c.score_budget,
+            next_milestone.c.id.label("milestone_id"),
+            next_milestone.c.name.label("milestone_name"),
+            next_milestone.c.amount.label("milestone_amount"),
+            next_milestone.c.due_date.label("milestone_due_date"),
+            pending_payments.c.pending_payments,
+            outstanding.c.outstanding_amount,
+            Project.last_message_at,
+        )
+        .select_from(Project)
+        .outerjoin(latest_log, true())
+        .outerjoin(next_milestone, true())
+        .join(pending_payments, true())
+        .join(outstanding, true())
+        .where(Project.owner_id == owner_id)
+        .order_by(Project.created_at.desc(), Project.id)
+    )
+
+
+def _load_portfolio(session: Session, owner_id: uuid.UUID) -> list[dict]:
+    project_keys = list(ProjectRead.model_fields)
+    width = len(project_keys)
+    items = []
+    for row in session.execute(_portfolio_statement(owner_id)):
+        latest_daily_log = None
+        if row.log_date is not None:
+            latest_daily_log = {
+                "date": row.log_date,
+                "score_schedule": row.score_schedule,
+                "score_budget": row.score_budget,
+            }
+        next_milestone = None
+        if row.milestone_id is not None:
+            next_milestone = {
+                "id": row.milestone_id,
+                "name": row.milestone_name,
+                "amount": row.milestone_amount,
+                "due_date": row.milestone_due_date,
+            }
+        items.append(
+            {
+                "project": dict(zip(project_keys, row[:width])),
+                "latest_daily_log": latest_daily_log,
+                "next_milestone": next_milestone,
+                "pending_payments": row.pending_payments,
+                "outstanding_amount": float(row.outstanding_amount),
+                "last_message_at": row.last_message_at,
+            }
+        )
+    return items
+
+
+def _owner_version(session: Session, kind: str, owner_id: uuid.UUID) -> tuple[str, Optional[datetime]]:
+    # Versão agregada barata (índice em owner_id) antes da consulta pesada.
+    count, version_sum, last_modified = session.execute(
+        select(
+            func.count(Project.id),
+            func.coalesce(func.sum(Project.version), 0),
+            func.max(Project.updated_at),
+        ).where(Project.owner_id == owner_id)
+    ).one()
+    etag = make_etag(
+        kind,
+        owner_id.hex,
+        count,
+        version_sum,
+        int(last_modified.timestamp() * 1_000_000) if last_modified else 0,
+    )
+    return etag, last_modified
+
+
+@router.get("", response_model=list[ProjectRead])
+def list_projects(owner_id: uuid.UUID, request: Request):
+    # Lista que o frontend consulta em polling: 304 enquanto nada mudou.
+    with Session(reader_engine()) as session:
+        etag, last_modified = _owner_version(session, "projects", owner_id)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        rows = session.execute(
+            select(*_PROJECT_COLUMNS)
+            .where(Project.owner_id == owner_id)
+            .order_by(Project.created_at.desc(), Project.id)
+        ).all()
+    fast = FastJSONResponse(rows_as_dicts(list(ProjectRead.model_fields), rows))
+    set_cache_headers(fast, etag, last_modified)
+    return fast
+
+
+@router.get("/portfolio", response_model=list[PortfolioItem])
+def get_portfolio(owner_id: uuid.UUID, request: Request):
+    with Session(reader_engine()) as session:
+        etag, last_modified = _owner_version(session, "portfolio", owner_id)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        fast = FastJSONResponse(_load_portfolio(session, owner_id))
+    set_cache_headers(fast, etag, last_modified)
+    return fast
+
+
+@router.get("/{project_id}", response_model=ProjectRead)
+def get_project(project_id: uuid.UUID, request: Request, response: Response):
+    with Session(reader_engine()) as session:
+        current = session.execute(
+            select(Project.version, Project.updated_at).where(Project.id == project_id)
+        ).first()
+        if current is None:
+            raise HTTPException(status_code=404, detail="Projeto não encontrado")
+        etag = make_etag(
+            project_id.hex, current.version, int(current.updated_at.timestamp() * 1_000_000)
+        )
+        if is_not_modified(request, etag, current.updated_at):
+            return not_modified(etag, current.updated_at)
+        set_cache_headers(response, etag, current.updated_at)
+        return _get_project(session, project_id)
+
+
+def _timeline_statement(
+    project_id: uuid.UUID,
+    limit: int,
+    before: Optional[datetime] = None,
+    before_id: Optional[uuid.UUID] = None,
+    since: Optional[datetime] = None,
+):
+    # Mais recentes primeiro, com id desempatando timestamps iguais (backfills,
+    # restaurações). Próxima página: before/before_id = created_at/id da última.
+    stmt = (
+        select(*_MESSAGE_COLUMNS)
+        .where(Message.project_id == project_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(limit)
+    )
+    if before is not None and before_id is not None:
+        # O <= redundante deixa o índice (project_id, created_at) delimitar a faixa.
+        stmt = stmt.where(
+            Message.created_at <= before,
+            tuple_(Message.created_at, Message.id) < tuple_(before, before_id),
+        )
+    elif before is not None:
+        stmt = stmt.where(Message.created_at < before)
+    if since is not None:
+        stmt = stmt.where(Message.created_at >= since)
+    return stmt
+
+
+def _load_timeline(
+    session: Session,
+    project: Project,
+    limit: int,
+    before: Optional[datetime],
+    before_id: Optional[uuid.UUID],
+) -> list:
+    anchor = before or project.last_message_at
+    if anchor is None:
+        return session.execute(_timeline_statement(project.id, limit, before, before_id)).all()
+    since = anchor - TIMELINE_WINDOW
+    rows = session.execute(_timeline_statement(project.id, limit, before, before_id, since)).all()
+    if len(rows) < limit:
+        # Tudo antes de since vem depois na ordenação: o cursor vira since.
+        rows += session.execute(_timeline_statement(project.id, limit - len(rows), since)).all()
+    return rows
+
+
+@router.get("/{project_id}/messages", response_model=list[MessageRead])
+def list_messages(
+    project_id: uuid.UUID,
+    limit: int = Query(default=100, ge=1, le=TIMELINE_MAX_LIMIT),
+    before: Optional[datetime] = None,
+    before_id: Optional[uuid.UUID] = None,
+):
+    if before_id is not None and before is None:
+        raise HTTPException(status_code=400, detail="before_id exige o parâmetro before")
+    with Session(reader_engine()) as session:
+        project = _get_project(session, project_id)
+        rows = _load_timeline(session, project, limit, before, before_id)
+    return FastJSONResponse(rows_as_dicts(list(MessageRead.model_fields), rows))
+
+
+def _project_exists(project_id: uuid.UUID) -> bool:
+    with Session(reader_engine()) as session:
+        return session.scalar(select(Project.id).where(Project.id == project_id)) is not None
+
+
+@router.get("/{project_id}/events")
+async def project_events(project_id: uuid.UUID):
+    if not await run_in_threadpool(_project_exists, project_id):
+        raise HTTPException(status_code=404, detail="Projeto não encontrado")
+    return StreamingResponse(
+        sse_stream(project_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{project_id}/export")
+def export_project(
+    project_id: uuid.UUID,
+    format: ExportFormat = ExportFormat.NDJSON,
+    entity: Optional[ExportEntity] = None,
+):
+    # Exportação é analítica: vai para a réplica quando houver.
+    read_engine = reader_engine()
+    with Session(read_engine) as session:
+        _get_project(session, project_id)
+        archived = session.scalar(
+            select(
+                select(MessageArchive.id)
+                .where(MessageArchive.project_id == project_id, MessageArchive.restored_at.is_(None))
+                .exists()
+            )
+        )
+    if archived:
+        # Um arquivo de auditoria sem os meses que estão no S3 seria incompleto sem aviso.
+        raise HTTPException(
+            status_code=409,
+            detail="Projeto tem mensagens arquivadas; restaure com POST /projects/{id}/archive/restore antes de exportar",
+        )
+
+    statements = entity_statements(project_id)
+    if entity is not None:
+        statements = {entity: statements[entity]}
+    elif format != ExportFormat.NDJSON:
+        raise HTTPException(status_code=400, detail="CSV e Parquet exigem o parâmetro entity")
+
+    if format == ExportFormat.NDJSON:
+        body = ndjson_stream(read_engine, statements)
+    elif format == ExportFormat.CSV:
+        body = csv_stream(read_engine, statements[entity])
+    else:
+        body = parquet_stream(read_engine, statements[entity])
+    filename = f"projeto-{project_id}-{entity.value if entity else 'completo'}.{format.value}"
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+class ArchiveRestoreRead(BaseModel):
+    restored_messages: int
+
+
+@router.post("/{project_id}/archive/restore", response_model=ArchiveRestoreRead)
+def restore_project_archive(project_id: uuid.UUID):
+    # Volta as mensagens arquivadas no S3 para a tabela quente (exportação, timeline).
+    with Session(engine) as session:
+        _get_project(session, project_id)
+    return ArchiveRestoreRead(restored_messages=restore_project(project_id))
+
+
 @router.post("", response_model=ProjectRead, status_code=201)
 def create_project(payload: ProjectCreate):
     with Session(engine) as session:
@@ -191,6 +554,7 @@ def update_project(project_id: uuid.UUID, payload: ProjectUpdate):
             data["status"] = data["status"].value
         for key, value in data.items():
             setattr(project, key, value)
+        project.version = Project.version + 1
         session.commit()
         session.refresh(project)
         return project
@@ -199,7 +563,7 @@ def update_project(project_id: uuid.UUID, payload: ProjectUpdate):
 @router.post("/{project_id}/participants", response_model=ParticipantRead, status_code=201)
 def add_participant(project_id: uuid.UUID, payload: ParticipantCreate):
     with Session(engine) as session:
-        _get_project(session, project_id)
+        _touch_project(session, project_id)
         participant = Participant(
             project_id=project_id,
             role=payload.role,
@@ -215,8 +579,9 @@ def add_participant(project_id: uuid.UUID, payload: ParticipantCreate):
 
 @router.post("/{project_id}/messages", response_model=MessageRead, status_code=201)
 def post_message(project_id: uuid.UUID, payload: MessageCreate):
+    created_at = datetime.now(timezone.utc)
     with Session(engine) as session:
-        _get_project(session, project_id)
+        _touch_project(session, project_id, last_message_at=created_at)
         sender_id = payload.sender_id
         if sender_id is not None:
             _get_participant(session, sender_id, project_id)
@@ -226,8 +591,11 @@ def post_message(project_id: uuid.UUID, payload: MessageCreate):
             type=payload.type.value,
             url=payload.url,
             transcript=payload.transcript,
+            created_at=created_at,
         )
         session.add(message)
+        session.flush()
+        notify_project_event(session, project_id, "message", message.id)
         session.commit()
         session.refresh(message)
         return message
@@ -236,7 +604,7 @@ def post_message(project_id: uuid.UUID, payload: MessageCreate):
 @router.post("/{project_id}/daily-logs", response_model=DailyLogRead, status_code=201)
 def register_daily_log(project_id: uuid.UUID, payload: DailyLogCreate):
     with Session(engine) as session:
-        _get_project(session, project_id)
+        _touch_project(session, project_id)
         daily_log = DailyLog(
             project_id=project_id,
             date=payload.date,
@@ -245,6 +613,8 @@ def register_daily_log(project_id: uuid.UUID, payload: DailyLogCreate):
             score_budget=payload.score_budget,
         )
         session.add(daily_log)
+        session.flush()
+        notify_project_event(session, project_id, "daily_log", daily_log.id)
         session.commit()
         session.refresh(daily_log)
         return daily_log
@@ -253,7 +623,7 @@ def register_daily_log(project_id: uuid.UUID, payload: DailyLogCreate):
 @router.post("/{project_id}/milestones", response_model=MilestoneRead, status_code=201)
 def create_milestone(project_id: uuid.UUID, payload: MilestoneCreate):
     with Session(engine) as session:
-        _get_project(session, project_id)
+        _touch_project(session, project_id)
         milestone = Milestone(
             project_id=project_id,
             name=payload.name,
@@ -274,6 +644,7 @@ def register_payment(project_id: uuid.UUID, payload: PaymentCreate):
         milestone = session.get(Milestone, payload.milestone_id)
         if not milestone or milestone.project_id != project_id:
             raise HTTPException(status_code=404, detail="Marco não encontrado para o projeto")
+        _touch_project(session, project_id)
         payment = Payment(
             milestone_id=payload.milestone_id,
             provider=payload.provider.value,
@@ -282,6 +653,8 @@ def register_payment(project_id: uuid.UUID, payload: PaymentCreate):
             paid_at=payload.paid_at,
         )
         session.add(payment)
+        session.flush()
+        notify_project_event(session, project_id, "payment", payment.id)
         session.commit()
         session.refresh(payment)
         return payment
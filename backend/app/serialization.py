@@ -0,0 +1,36 @@
+from decimal import Decimal
+from typing import Any, Iterable, Sequence
+
+import orjson
+from fastapi.responses import Response
+
+# OPT_UTC_Z: datetimes em UTC saem com "Z", como no caminho do Pydantic.
+_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} não é serializável em JSON")
+
+
+def dumps(value: Any) -> bytes:
+    # UUID, datetime e date são nativos no orjson; Decimal vira float como no
+    # Pydantic (os schemas declaram os valores monetários como float).
+    return orjson.dumps(value, default=_default, option=_OPTIONS)
+
+
+def rows_as_dicts(keys: Sequence[str], rows: Iterable[Sequence]) -> list[dict]:
+    return [dict(zip(keys, row)) for row in rows]
+
+
+class FastJSONResponse(Response):
+    # JSON direto de tuplas/dicts. A rota mantém o response_model para o
+    # OpenAPI, mas como devolve uma Response o FastAPI não valida nem
+    # reserializa: quem monta o conteúdo garante que ele bate com o schema.
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
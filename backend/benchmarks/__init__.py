@@ -0,0 +1 @@
+# vazio propositalmente (torna 'benchmarks' um pacote Python)
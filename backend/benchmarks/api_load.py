@@ -0,0 +1,297 @@
+# Carga assíncrona contra a API com dados sintéticos; grava throughput e
+# p50/p95/p99 por rota em JSON e, com --baseline, falha em regressões.
+#
+#   DATABASE_URL=... python -m benchmarks.api_load --scale small --duration 30 \
+#       --output benchmarks/results/atual.json --baseline benchmarks/results/main.json
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Optional
+
+import httpx
+
+from app.db import engine
+from app.migrations import migrate
+from benchmarks.compare import compare_results, print_comparison
+from benchmarks.seed import SCALES, drop_projects, drop_users, seed_login_tokens, seed_projects, seed_users
+from benchmarks.stats import summarize
+
+
+class Workload:
+    # Cada ação devolve o rótulo da rota e a requisição ainda não enviada, para
+    # que falhas de transporte e timeouts caiam na mesma rota que os sucessos.
+
+    def __init__(self, dataset: dict, emails: list[str], tokens: list[str], rng: random.Random):
+        self.rng = rng
+        self.owners = list(dataset["projects"])
+        self.projects = [pid for pids in dataset["projects"].values() for pid in pids]
+        self.participants = dataset["participants"]
+        self.milestones = dataset["milestones"]
+        self.emails = emails
+        self.tokens = tokens
+        self.etags: dict[str, str] = {}
+
+    def _project(self) -> str:
+        return str(self.rng.choice(self.projects))
+
+    def get_project(self, client: httpx.AsyncClient) -> tuple[str, Awaitable[httpx.Response]]:
+        project_id = self._project()
+        headers = {}
+        # Metade das leituras revalida com a ETag já vista (caminho 304).
+        if project_id in self.etags and self.rng.random() < 0.5:
+            headers["If-None-Match"] = self.etags[project_id]
+
+        async def request():
+            response = await client.get(f"/projects/{project_id}", headers=headers)
+            if response.status_code == 200 and "etag" in response.headers:
+                self.etags[project_id] = response.headers["etag"]
+            return response
+
+        return "GET /projects/{project_id}", request()
+
+    def get_portfolio(self, client):
+        owner_id = self.rng.choice(self.owners)
+        return "GET /projects/portfolio", client.get("/projects/portfolio", params={"owner_id": str(owner_id)})
+
+    def post_message(self, client):
+        project_id = self.rng.choice(self.projects)
+        senders = self.participants.get(project_id) or [None]
+        sender = self.rng.choice(senders)
+        payload = {"type": "text", "transcript": "Reboco concluído na fachada"}
+        if sender is not None:
+            payload["sender_id"] = str(sender)
+        return "POST /projects/{project_id}/messages", client.post(f"/projects/{project_id}/messages", json=payload)
+
+    def post_daily_log(self, client):
+        payload = {
+            "date": date.today().isoformat(),
+            "summary_text": "Dia produtivo",
+            "score_schedule": self.rng.randint(0, 100),
+            "score_budget": self.rng.randint(0, 100),
+        }
+        return "POST /projects/{project_id}/daily-logs", client.post(f"/projects/{self._project()}/daily-logs", json=payload)
+
+    def post_milestone(self, client):
+        payload = {"name": "Pintura", "amount": 12000, "due_date": date.today().isoformat()}
+        return "POST /projects/{project_id}/milestones", client.post(f"/projects/{self._project()}/milestones", json=payload)
+
+    def post_payment(self, client):
+        project_id = self.rng.choice([pid for pid in self.projects if self.milestones.get(pid)])
+        payload = {
+            "milestone_id": str(self.rng.choice(self.milestones[project_id])),
+            "provider": "pix",
+            "paid_at": datetime.now(timezone.utc).isoformat(),
+        }
+        return "POST /projects/{project_id}/payments", client.post(f"/projects/{project_id}/payments", json=payload)
+
+    def put_project(self, client):
+        return "PUT /projects/{project_id}", client.put(f"/projects/{self._project()}", json={"address": "Rua Nova, 10"})
+
+    def magic_request(self, client):
+        return "POST /auth/magic/request", client.post("/auth/magic/request", json={"email": self.rng.choice(self.emails)})
+
+    def magic_consume(self, client):
+        if not self.tokens:
+            return self.magic_request(client)
+        return "POST /auth/magic/consume", client.post("/auth/magic/consume", params={"token": self.tokens.pop()})
+
+    def mix(self):
+        # Peso aproximado do tráfego real: leituras dominam.
+        return [
+            (self.get_project, 30),
+            (self.get_portfolio, 15),
+            (self.post_message, 20),
+            (self.post_daily_log, 5),
+            (self.post_milestone, 3),
+            (self.post_payment, 3),
+            (self.put_project, 4),
+            (self.magic_request, 10),
+            (self.magic_consume, 10),
+        ]
+
+
+async def _worker(client, workload: Workload, deadline: float, warmup_until: float, samples: dict, errors: dict):
+    actions, weights = zip(*workload.mix())
+    while time.perf_counter() < deadline:
+        action = workload.rng.choices(actions, weights)[0]
+        route, request = action(client)
+        start = time.perf_counter()
+        try:
+            response = await request
+            failed = response.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if start < warmup_until:
+            continue
+        samples.setdefault(route, []).append(elapsed_ms)
+        if failed:
+            errors[route] = errors.get(route, 0) + 1
+
+
+async def run_load(base_url: str, workload: Workload, concurrency: int, duration: float, warmup: float) -> dict:
+    samples: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        warmup_until = start + warmup
+        deadline = warmup_until + duration
+        await asyncio.gather(
+            *(_worker(client, workload, deadline, warmup_until, samples, errors) for _ in range(concurrency))
+        )
+    return build_result(samples, errors, duration)
+
+
+def build_result(samples: dict[str, list[float]], errors: dict[str, int], duration: float) -> dict:
+    routes = {}
+    for route, values in sorted(samples.items()):
+        routes[route] = {
+            "requests": len(values),
+            "errors": errors.get(route, 0),
+            "rps": len(values) / duration,
+            **summarize(values),
+        }
+    all_samples = [value for values in samples.values() for value in values]
+    total = {
+        "requests": len(all_samples),
+        "errors": sum(errors.values()),
+        "rps": len(all_samples) / duration,
+        **summarize(all_samples),
+    }
+    return {"routes": routes, "total": total}
+
+
+def _start_server(port: int, workers: int, log) -> subprocess.Popen:
+    env = {**os.environ, "FRONTEND_URL": os.getenv("FRONTEND_URL", "http://localhost:3000")}
+    # Sem RESEND_API_KEY o /auth/magic/request não envia e-mail.
+    env.pop("RESEND_API_KEY", None)
+    env.setdefault("JWT_SECRET", "benchmark")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=env,
+        # Arquivo e não PIPE: ninguém lê o pipe durante a carga e ele encheria.
+        stderr=log,
+    )
+
+
+def _wait_healthy(base_url: str, server: Optional[subprocess.Popen] = None, log=None, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            log.seek(0)
+            stderr = log.read().decode(errors="replace")
+            raise RuntimeError(f"API encerrou com código {server.returncode} antes de responder:\n{stderr}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API não respondeu em {base_url}")
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--owners", type=int)
+    parser.add_argument("--projects", type=int, help="projetos por proprietário")
+    parser.add_argument("--messages", type=int, help="mensagens por projeto")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--base-url", help="usa uma API já em execução em vez de subir uma")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regressão tolerada, em %%")
+    parser.add_argument("--keep-data", action="store_true")
+    args = parser.parse_args()
+
+    sizes = dict(SCALES[args.scale])
+    for key in ("owners", "projects", "messages"):
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    migrate()
+    run_id = f"bench-{uuid.uuid4().hex[:8]}"
+    owner_ids = [uuid.uuid4() for _ in range(sizes.pop("owners"))]
+    seed_start = time.perf_counter()
+    with engine.begin() as conn:
+        dataset = seed_projects(conn, owner_ids, seed=args.seed, **sizes)
+        emails = seed_users(conn, run_id, 50)
+        tokens = seed_login_tokens(conn, emails, 50_000)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    print(f"dados gerados em {time.perf_counter() - seed_start:.1f}s")
+
+    server = None
+    server_log = tempfile.TemporaryFile()
+    base_url = args.base_url or f"http://127.0.0.1:{args.port}"
+    try:
+        if not args.base_url:
+            server = _start_server(args.port, args.workers, server_log)
+        _wait_healthy(base_url, server, server_log)
+        workload = Workload(dataset, emails, tokens, random.Random(args.seed))
+        result = asyncio.run(run_load(base_url, workload, args.concurrency, args.duration, args.warmup))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        server_log.close()
+        if not args.keep_data:
+            with engine.begin() as conn:
+                drop_projects(conn, [pid for pids in dataset["projects"].values() for pid in pids])
+                drop_users(conn, run_id)
+
+    result["meta"] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "scale": args.scale,
+        "sizes": sizes,
+        "owners": len(owner_ids),
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "workers": args.workers,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+
+    print(f"{'rota':<42} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'erros':>6}")
+    for route, stats in result["routes"].items():
+        print(
+            f"{route:<42} {stats['rps']:>8.1f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+            f"{stats['p99_ms']:>8.1f} {stats['errors']:>6}"
+        )
+    print(f"resultado salvo em {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare_results(baseline, result, args.threshold)
+        print_comparison(regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Compara dois resultados de benchmarks.api_load e sai com 1 se houver regressão.
+#
+#   python -m benchmarks.compare base.json atual.json --threshold 10
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def compare_results(baseline: dict, current: dict, threshold_pct: float) -> list[str]:
+    regressions = []
+    factor = threshold_pct / 100
+    for route, base in baseline["routes"].items():
+        now = current["routes"].get(route)
+        if now is None:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if base[metric] > 0 and now[metric] > base[metric] * (1 + factor):
+                regressions.append(f"{route}: {metric} {base[metric]:.1f} -> {now[metric]:.1f}")
+        if base["rps"] > 0 and now["rps"] < base["rps"] * (1 - factor):
+            regressions.append(f"{route}: rps {base['rps']:.1f} -> {now['rps']:.1f}")
+        base_error_rate = base["errors"] / base["requests"] if base["requests"] else 0
+        now_error_rate = now["errors"] / now["requests"] if now["requests"] else 0
+        if now_error_rate > base_error_rate + factor / 10:
+            regressions.append(f"{route}: erros {base_error_rate:.1%} -> {now_error_rate:.1%}")
+    return regressions
+
+
+def print_comparison(regressions: list[str]) -> None:
+    if not regressions:
+        print("sem regressões")
+        return
+    print("REGRESSÕES:")
+    for line in regressions:
+        print(f"  {line}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regressão tolerada, em %%")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    regressions = compare_results(baseline, current, args.threshold)
+    print_comparison(regressions)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
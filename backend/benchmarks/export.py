@@ -0,0 +1,116 @@
+# Exporta um projeto com muitas mensagens e mede linhas/s e pico de RSS.
+# Cada formato roda em um processo novo para o pico de RSS ser comparável.
+#
+#   DATABASE_URL=... python -m benchmarks.export --messages 1000000
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import insert, text
+
+from app.db import engine
+from app.export import ExportEntity, ExportFormat, csv_stream, entity_statements, ndjson_stream, parquet_stream
+from app.migrations import migrate
+from app.models import Project
+from benchmarks.seed import drop_projects
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _rss_mb() -> float:
+    # ru_maxrss é em KiB no Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _seed(messages: int) -> uuid.UUID:
+    project_id = uuid.uuid4()
+    with engine.begin() as conn:
+        conn.execute(
+            insert(Project),
+            {"id": project_id, "title": "Exportação", "currency": "BRL", "owner_id": uuid.uuid4()},
+        )
+        # Direto no banco: gerar 1M de linhas em Python distorceria o benchmark.
+        conn.execute(
+            text(
+                "INSERT INTO messages (id, project_id, type, transcript, created_at) "
+                "SELECT gen_random_uuid(), :project_id, 'text', "
+                "'Atualização ' || g || ': alvenaria do pavimento superior', "
+                "now() - g * interval '1 second' "
+                "FROM generate_series(1, :messages) AS g"
+            ),
+            {"project_id": project_id, "messages": messages},
+        )
+    return project_id
+
+
+def _child(project_id: uuid.UUID, export_format: ExportFormat) -> None:
+    messages = entity_statements(project_id)[ExportEntity.MESSAGES]
+    statements = {ExportEntity.MESSAGES: messages}
+    baseline = _rss_mb()
+    if export_format == ExportFormat.NDJSON:
+        stream = ndjson_stream(engine, statements)
+    elif export_format == ExportFormat.CSV:
+        stream = csv_stream(engine, messages)
+    else:
+        stream = parquet_stream(engine, messages)
+
+    start = time.perf_counter()
+    total_bytes = 0
+    chunks = 0
+    for chunk in stream:
+        total_bytes += len(chunk)
+        chunks += 1
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "seconds": elapsed,
+                "bytes": total_bytes,
+                "chunks": chunks,
+                "baseline_rss_mb": baseline,
+                "peak_rss_mb": _rss_mb(),
+            }
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--formats", nargs="+", default=[f.value for f in ExportFormat])
+    parser.add_argument("--child", nargs=2, metavar=("PROJECT_ID", "FORMAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(uuid.UUID(args.child[0]), ExportFormat(args.child[1]))
+        return
+
+    migrate()
+    seed_start = time.perf_counter()
+    project_id = _seed(args.messages)
+    print(f"{args.messages} mensagens geradas em {time.perf_counter() - seed_start:.1f}s")
+    try:
+        for export_format in args.formats:
+            output = subprocess.check_output(
+                [sys.executable, "-m", "benchmarks.export", "--child", str(project_id), export_format],
+                cwd=BACKEND_DIR,
+                text=True,
+            )
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f"{export_format:<8} {args.messages / result['seconds']:>10,.0f} linhas/s "
+                f"{result['bytes'] / 1_048_576:>8.1f} MiB em {result['chunks']} blocos "
+                f"RSS {result['baseline_rss_mb']:.0f} -> {result['peak_rss_mb']:.0f} MiB"
+            )
+    finally:
+        with engine.begin() as conn:
+            drop_projects(conn, [project_id])
+
+
+if __name__ == "__main__":
+    main()
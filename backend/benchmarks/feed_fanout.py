@@ -0,0 +1,82 @@
+# Abre N assinantes SSE num projeto, publica mensagens e mede a entrega.
+# Confere no pg_stat_activity que o worker usa uma única conexão LISTEN.
+#
+#   uvicorn app.main:app --workers 1 &
+#   DATABASE_URL=... python -m benchmarks.feed_fanout --subscribers 500 --messages 20
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+from sqlalchemy import text
+
+from app.db import engine
+
+
+async def _subscriber(client: httpx.AsyncClient, url: str, ready: asyncio.Event, received: list, total: int, connected: list):
+    async with client.stream("GET", url) as response:
+        connected.append(1)
+        ready.set()
+        count = 0
+        async for line in response.aiter_lines():
+            if line.startswith("event: message"):
+                received.append(time.perf_counter())
+                count += 1
+                if count >= total:
+                    return
+
+
+def _listen_connections() -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT count(*) FROM pg_stat_activity WHERE query ILIKE 'LISTEN %'")
+        ).scalar_one()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=20)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.subscribers + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=None) as client:
+        project = (
+            await client.post(
+                "/projects", json={"title": "Fan-out", "currency": "BRL", "owner_id": str(uuid.uuid4())}
+            )
+        ).json()
+        url = f"/projects/{project['id']}/events"
+
+        ready = asyncio.Event()
+        received: list[float] = []
+        connected: list[int] = []
+        tasks = [
+            asyncio.create_task(_subscriber(client, url, ready, received, args.messages, connected))
+            for _ in range(args.subscribers)
+        ]
+        while len(connected) < args.subscribers:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.5)
+        listen_conns = await asyncio.to_thread(_listen_connections)
+
+        sent_at = []
+        for n in range(args.messages):
+            sent_at.append(time.perf_counter())
+            await client.post(url.replace("/events", "/messages"), json={"type": "text", "transcript": f"msg {n}"})
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=60)
+
+    expected = args.subscribers * args.messages
+    spread_ms = (max(received) - sent_at[0]) * 1000 if received else 0.0
+    print(f"assinantes={args.subscribers} mensagens={args.messages}")
+    print(f"conexões LISTEN no banco={listen_conns}")
+    print(f"eventos entregues={len(received)}/{expected}")
+    if received:
+        print(f"tempo total de entrega={spread_ms:.0f}ms, mediana após envio={statistics.median(r - sent_at[0] for r in received) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+# Mede a latência do portfolio (consulta única com LATERAL) contra o padrão
+# ingênuo de 4 consultas por projeto.
+#
+#   DATABASE_URL=... python -m benchmarks.portfolio --scales 10 100 1000
+import argparse
+import time
+import uuid
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db import engine
+from app.migrations import migrate
+from app.models import DailyLog, Message, Milestone, MilestoneStatus, Payment, PaymentStatus, Project
+from app.routers.projects import _load_portfolio
+from benchmarks.seed import drop_projects, seed_portfolio
+from benchmarks.stats import summarize
+
+
+def _naive_portfolio(session: Session, owner_id: uuid.UUID) -> int:
+    projects = session.scalars(select(Project).where(Project.owner_id == owner_id)).all()
+    for project in projects:
+        session.execute(
+            select(DailyLog)
+            .where(DailyLog.project_id == project.id)
+            .order_by(DailyLog.date.desc())
+            .limit(1)
+        ).first()
+        session.execute(
+            select(Milestone)
+            .where(
+                Milestone.project_id == project.id,
+                Milestone.status == MilestoneStatus.PENDING.value,
+            )
+            .order_by(Milestone.due_date)
+            .limit(1)
+        ).first()
+        session.execute(
+            select(func.count(Payment.id))
+            .join(Milestone, Milestone.id == Payment.milestone_id)
+            .where(
+                Milestone.project_id == project.id,
+                Payment.status == PaymentStatus.PENDING.value,
+            )
+        ).scalar()
+        session.execute(
+            select(func.sum(Milestone.amount)).where(
+                Milestone.project_id == project.id,
+                select(Payment.id)
+                .where(
+                    Payment.milestone_id == Milestone.id,
+                    Payment.status == PaymentStatus.PENDING.value,
+                )
+                .exists(),
+            )
+        ).scalar()
+        session.execute(
+            select(func.max(Message.created_at)).where(Message.project_id == project.id)
+        ).scalar()
+    return len(projects)
+
+
+def _measure(fn, repeat: int) -> dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            fn(session)
+            samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--skip-naive", action="store_true")
+    args = parser.parse_args()
+
+    migrate()
+    for scale in args.scales:
+        owner_id = uuid.uuid4()
+        with engine.begin() as conn:
+            project_ids = seed_portfolio(conn, owner_id, scale)
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql("ANALYZE")
+            lateral = _measure(lambda s: _load_portfolio(s, owner_id), args.repeat)
+            line = f"{scale:>6} projetos | lateral p50={lateral['p50_ms']:.1f}ms p95={lateral['p95_ms']:.1f}ms"
+            if not args.skip_naive:
+                naive = _measure(lambda s: _naive_portfolio(s, owner_id), args.repeat)
+                line += f" | n+1 p50={naive['p50_ms']:.1f}ms p95={naive['p95_ms']:.1f}ms"
+            print(line)
+        finally:
+            with engine.begin() as conn:
+                drop_projects(conn, project_ids)
+
+
+if __name__ == "__main__":
+    main()
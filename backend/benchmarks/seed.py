@@ -0,0 +1,227 @@
+import hashlib
+import random
+import secrets
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import Connection, delete, insert
+
+from app.models import (
+    Annotation,
+    DailyLog,
+    EmailLoginToken,
+    Message,
+    MessageType,
+    Milestone,
+    MilestoneStatus,
+    Participant,
+    Payment,
+    PaymentProvider,
+    PaymentStatus,
+    Project,
+    ProjectStatus,
+    User,
+)
+
+BATCH_SIZE = 5_000
+
+# Tamanhos por projeto para cada escala de --scale.
+SCALES = {
+    "small": {"owners": 5, "projects": 4, "participants": 3, "messages": 50, "annotations": 1, "daily_logs": 30, "milestones": 6, "payments": 1},
+    "medium": {"owners": 20, "projects": 10, "participants": 5, "messages": 200, "annotations": 1, "daily_logs": 90, "milestones": 10, "payments": 1},
+    "large": {"owners": 50, "projects": 20, "participants": 8, "messages": 1_000, "annotations": 2, "daily_logs": 365, "milestones": 12, "payments": 2},
+}
+
+
+def _insert(conn: Connection, model, rows: list[dict]) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(model), rows[start : start + BATCH_SIZE])
+
+
+def seed_projects(
+    conn: Connection,
+    owner_ids: list[uuid.UUID],
+    projects: int,
+    participants: int = 3,
+    messages: int = 20,
+    annotations: int = 0,
+    daily_logs: int = 30,
+    milestones: int = 6,
+    payments: int = 1,
+    seed: int = 42,
+) -> dict:
+    # Quantidades por projeto (annotations por mensagem, payments por marco).
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    today = date.today()
+    dataset = {"projects": {}, "participants": {}, "milestones": {}}
+
+    for owner_id in owner_ids:
+        project_rows = [
+            {
+                "id": uuid.uuid4(),
+                "title": f"Obra {i}",
+                "address": f"Rua {i}, {rng.randint(1, 999)}",
+                "currency": "BRL",
+                "owner_id": owner_id,
+                "status": ProjectStatus.ACTIVE.value,
+                "last_message_at": None,
+            }
+            for i in range(projects)
+        ]
+        dataset["projects"][owner_id] = [row["id"] for row in project_rows]
+
+        participant_rows = []
+        log_rows = []
+        milestone_rows = []
+        message_rows = []
+        annotation_rows = []
+        for project in project_rows:
+            project_id = project["id"]
+            project_participants = [
+                {
+                    "id": uuid.uuid4(),
+                    "project_id": project_id,
+                    "role": rng.choice(["mestre de obras", "engenheiro", "proprietário", "eletricista"]),
+                    "name": f"Participante {n}",
+                    "phone": f"+55119{rng.randint(10_000_000, 99_999_999)}",
+                    "can_post": True,
+                }
+                for n in range(participants)
+            ]
+            participant_rows.extend(project_participants)
+            dataset["participants"][project_id] = [row["id"] for row in project_participants]
+
+            for day in range(daily_logs):
+                log_rows.append(
+                    {
+                        "id": uuid.uuid4(),
+                        "project_id": project_id,
+                        "date": today - timedelta(days=day),
+                        "summary_text": "Concretagem da laje",
+                        "score_schedule": rng.randint(0, 100),
+                        "score_budget": rng.randint(0, 100),
+                    }
+                )
+
+            project_milestones = [
+                {
+                    "id": uuid.uuid4(),
+                    "project_id": project_id,
+                    "name": f"Etapa {n}",
+                    "amount": rng.randint(1_000, 50_000),
+                    "criteria": "Vistoria aprovada",
+                    "status": rng.choice(list(MilestoneStatus)).value,
+                    "due_date": today + timedelta(days=rng.randint(-60, 120)),
+                }
+                for n in range(milestones)
+            ]
+            milestone_rows.extend(project_milestones)
+            dataset["milestones"][project_id] = [row["id"] for row in project_milestones]
+
+            for n in range(messages):
+                message_id = uuid.uuid4()
+                created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+                project["last_message_at"] = max(project["last_message_at"] or created_at, created_at)
+                message_rows.append(
+                    {
+                        "id": message_id,
+                        "project_id": project_id,
+                        "sender_id": rng.choice(project_participants)["id"] if project_participants else None,
+                        "type": MessageType.TEXT.value,
+                        "transcript": f"Atualização {n}: alvenaria do pavimento superior",
+                        "created_at": created_at,
+                    }
+                )
+                for _ in range(annotations):
+                    annotation_rows.append(
+                        {
+                            "id": uuid.uuid4(),
+                            "message_id": message_id,
+                            "message_created_at": created_at,
+                            "area": "Pavimento superior",
+                            "task": "Alvenaria",
+                            "phase": "Estrutura",
+                            "percent_complete": rng.randint(0, 100),
+                            "confidence": rng.randint(50, 100),
+                        }
+                    )
+
+        payment_rows = [
+            {
+                "id": uuid.uuid4(),
+                "milestone_id": row["id"],
+                "provider": rng.choice(list(PaymentProvider)).value,
+                "status": rng.choice(list(PaymentStatus)).value,
+            }
+            for row in milestone_rows
+            for _ in range(payments)
+        ]
+
+        for model, rows in (
+            (Project, project_rows),
+            (Participant, participant_rows),
+            (DailyLog, log_rows),
+            (Milestone, milestone_rows),
+            (Payment, payment_rows),
+            (Message, message_rows),
+            (Annotation, annotation_rows),
+        ):
+            if rows:
+                _insert(conn, model, rows)
+    return dataset
+
+
+def seed_portfolio(
+    conn: Connection,
+    owner_id: uuid.UUID,
+    projects: int,
+    daily_logs: int = 30,
+    milestones: int = 6,
+    messages: int = 20,
+    seed: int = 42,
+) -> list[uuid.UUID]:
+    dataset = seed_projects(
+        conn,
+        [owner_id],
+        projects,
+        participants=0,
+        messages=messages,
+        daily_logs=daily_logs,
+        milestones=milestones,
+        seed=seed,
+    )
+    return dataset["projects"][owner_id]
+
+
+def seed_users(conn: Connection, prefix: str, count: int) -> list[str]:
+    emails = [f"{prefix}-{n}@example.com" for n in range(count)]
+    _insert(conn, User, [{"id": uuid.uuid4(), "email": email} for email in emails])
+    return emails
+
+
+def seed_login_tokens(conn: Connection, emails: list[str], count: int) -> list[str]:
+    # Tokens de uso único para /auth/magic/consume; devolve os valores brutos.
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=6)
+    raw_tokens = [secrets.token_urlsafe(32) for _ in range(count)]
+    rows = [
+        {
+            "email": emails[n % len(emails)],
+            "token_hash": hashlib.sha256(raw.encode()).hexdigest(),
+            "expires_at": expires_at,
+        }
+        for n, raw in enumerate(raw_tokens)
+    ]
+    _insert(conn, EmailLoginToken, rows)
+    return raw_tokens
+
+
+def drop_projects(conn: Connection, project_ids: list[uuid.UUID]) -> None:
+    # As tabelas filhas usam ON DELETE CASCADE.
+    for start in range(0, len(project_ids), BATCH_SIZE):
+        conn.execute(delete(Project).where(Project.id.in_(project_ids[start : start + BATCH_SIZE])))
+
+
+def drop_users(conn: Connection, prefix: str) -> None:
+    conn.execute(delete(EmailLoginToken).where(EmailLoginToken.email.startswith(f"{prefix}-")))
+    conn.execute(delete(User).where(User.email.startswith(f"{prefix}-")))
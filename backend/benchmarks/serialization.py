@@ -0,0 +1,117 @@
+# Compara, para uma timeline de 10k mensagens, o caminho atual das rotas
+# (entidades ORM -> response_model com from_attributes -> JSONResponse) com o
+# caminho rápido (tuplas -> orjson -> FastJSONResponse). Mede linhas/s e, em
+# uma rodada separada com tracemalloc, blocos e bytes alocados.
+#
+#   DATABASE_URL=... python -m benchmarks.serialization --rows 10000
+import argparse
+import time
+import tracemalloc
+import uuid
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db import engine
+from app.migrations import migrate
+from app.models import Message
+from app.routers.projects import MessageRead, _timeline_statement
+from app.serialization import FastJSONResponse, rows_as_dicts
+from benchmarks.export import _seed
+from benchmarks.seed import drop_projects
+from benchmarks.stats import summarize
+
+_ADAPTER = TypeAdapter(list[MessageRead])
+_KEYS = list(MessageRead.model_fields)
+
+
+def _pydantic_path(session: Session, project_id: uuid.UUID, limit: int):
+    # O que o FastAPI faz com response_model: valida e serializa de novo.
+    messages = session.scalars(
+        select(Message)
+        .where(Message.project_id == project_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(limit)
+    ).all()
+    models = _ADAPTER.validate_python(messages, from_attributes=True)
+    body = JSONResponse(_ADAPTER.dump_python(models, mode="json")).body
+    return messages, models, body
+
+
+def _fast_path(session: Session, project_id: uuid.UUID, limit: int):
+    rows = session.execute(_timeline_statement(project_id, limit)).all()
+    body = FastJSONResponse(rows_as_dicts(_KEYS, rows)).body
+    return rows, body
+
+
+def _measure(fn, project_id: uuid.UUID, rows: int, repeat: int) -> dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            fn(session, project_id, rows)
+            samples.append((time.perf_counter() - start) * 1000)
+    result = summarize(samples)
+    result["rows_per_second"] = rows / (result["p50_ms"] / 1000)
+    return result
+
+
+def _allocations(fn, project_id: uuid.UUID, rows: int) -> dict[str, float]:
+    # Mantém os intermediários vivos até o snapshot para contar tudo que o
+    # caminho construiu, não só o corpo final.
+    with Session(engine) as session:
+        fn(session, project_id, rows)  # aquece caches de compilação do SQLAlchemy
+        session.expunge_all()
+        tracemalloc.start()
+        kept = fn(session, project_id, rows)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    stats = snapshot.statistics("filename")
+    del kept
+    return {
+        "blocks": sum(stat.count for stat in stats),
+        "kib": sum(stat.size for stat in stats) / 1024,
+        "peak_kib": peak / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    migrate()
+    project_id = _seed(args.rows)
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE messages")
+        results = {}
+        for name, fn in (("pydantic", _pydantic_path), ("rápido", _fast_path)):
+            _measure(fn, project_id, args.rows, 2)  # aquecimento
+            results[name] = (
+                _measure(fn, project_id, args.rows, args.repeat),
+                _allocations(fn, project_id, args.rows),
+            )
+            timing, allocations = results[name]
+            print(
+                f"{name:<9} {timing['rows_per_second']:>10,.0f} linhas/s "
+                f"p50={timing['p50_ms']:.1f}ms p95={timing['p95_ms']:.1f}ms | "
+                f"{allocations['blocks']:>9,} blocos {allocations['kib']:>9,.0f} KiB "
+                f"(pico {allocations['peak_kib']:,.0f} KiB)"
+            )
+        slow, fast = results["pydantic"], results["rápido"]
+        print(
+            f"ganho: {fast[0]['rows_per_second'] / slow[0]['rows_per_second']:.1f}x linhas/s, "
+            f"{slow[1]['blocks'] / fast[1]['blocks']:.1f}x menos blocos"
+        )
+    finally:
+        with engine.begin() as conn:
+            drop_projects(conn, [project_id])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Mede o tempo de import do app e do boot (lifespan) em processos novos,
+# como num cold start. --importtime lista os módulos mais caros.
+#
+#   DATABASE_URL=... python -m benchmarks.startup --runs 10
+import argparse
+import asyncio
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.stats import summarize
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _child() -> None:
+    start = time.perf_counter()
+    from app.main import app
+
+    imported = time.perf_counter()
+
+    async def boot():
+        async with app.router.lifespan_context(app):
+            return time.perf_counter()
+
+    booted = asyncio.run(boot())
+    print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (booted - imported) * 1000}))
+
+
+def _run_child() -> dict:
+    start = time.perf_counter()
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.startup", "--child"], cwd=BACKEND_DIR, text=True
+    )
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def _slowest_imports(limit: int) -> list[tuple[int, str]]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        # Só os imports de primeiro nível de app.* e suas dependências diretas.
+        if match and len(match.group(2)) <= 5:
+            rows.append((int(match.group(1)), match.group(3)))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--importtime", type=int, default=0, metavar="N")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child()
+        return
+
+    runs = [_run_child() for _ in range(args.runs)]
+    for key in ("import_ms", "startup_ms", "process_ms"):
+        stats = summarize([run[key] for run in runs])
+        print(f"{key:<11} p50={stats['p50_ms']:.0f}ms p95={stats['p95_ms']:.0f}ms max={stats['max_ms']:.0f}ms")
+
+    if args.importtime:
+        print("\nimports mais caros (cumulativo):")
+        for micros, module in _slowest_imports(args.importtime):
+            print(f"  {micros / 1000:>7.1f}ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
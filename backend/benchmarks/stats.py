@@ -0,0 +1,20 @@
+import math
+
+
+def percentile(sorted_samples: list[float], pct: float) -> float:
+    # Nearest-rank: sempre um valor observado.
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples_ms: list[float]) -> dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "mean_ms": sum(ordered) / len(ordered) if ordered else 0.0,
+        "max_ms": ordered[-1] if ordered else 0.0,
+    }
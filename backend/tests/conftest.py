@@ -0,0 +1,49 @@
+import os
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy.exc import OperationalError
+
+# Os testes que tocam o banco usam DATABASE_URL (um Postgres de teste) e são
+# pulados sem ele; os demais rodam em qualquer lugar.
+@pytest.fixture(scope="session")
+def db_engine():
+    if not os.getenv("DATABASE_URL"):
+        pytest.skip("DATABASE_URL não configurada")
+    from app.db import engine
+    from app.migrations import migrate
+
+    try:
+        migrate(engine)
+    except OperationalError as exc:
+        pytest.skip(f"Banco indisponível: {exc.orig}")
+    return engine
+
+
+@pytest.fixture
+async def api(db_engine):
+    # O app inteiro, sem lifespan: migrate() já rodou em db_engine.
+    from app.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste") as client:
+        yield client
+
+
+@pytest.fixture
+def new_project(db_engine, api):
+    # Cria projetos pela API e apaga tudo (filhos em cascata) no fim do teste.
+    from benchmarks.seed import drop_projects
+
+    created = []
+
+    async def create(**fields) -> dict:
+        payload = {"title": "Obra de teste", "currency": "BRL", "owner_id": str(uuid.uuid4()), **fields}
+        response = await api.post("/projects", json=payload)
+        assert response.status_code == 201, response.text
+        created.append(uuid.UUID(response.json()["id"]))
+        return response.json()
+
+    yield create
+    with db_engine.begin() as conn:
+        drop_projects(conn, created)
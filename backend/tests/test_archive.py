@@ -0,0 +1,121 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não configurada", allow_module_level=True)
+
+from app import archive  # noqa: E402
+from app.models import Annotation, Message, MessageArchive, Project  # noqa: E402
+
+BUCKET = "arquivo-de-teste"
+
+
+class MemoryS3:
+    # Só as duas chamadas que o job usa; o S3 real fica fora dos testes.
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+
+    def upload_fileobj(self, fileobj, bucket: str, key: str) -> None:
+        self.objects[bucket, key] = fileobj.read()
+
+    def download_fileobj(self, bucket: str, key: str, fileobj) -> None:
+        fileobj.write(self.objects[bucket, key])
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    s3 = MemoryS3()
+    monkeypatch.setattr(archive, "_s3", lambda: s3)
+    monkeypatch.setenv("S3_BUCKET_PROCESSED", BUCKET)
+    return s3
+
+
+def _messages(db_engine, project_id: uuid.UUID) -> list[tuple]:
+    with Session(db_engine) as session:
+        return session.execute(
+            select(Message.id, Message.transcript, Message.created_at)
+            .where(Message.project_id == project_id)
+            .order_by(Message.created_at)
+        ).all()
+
+
+def _annotations(db_engine, project_id: uuid.UUID) -> list[tuple]:
+    with Session(db_engine) as session:
+        return session.execute(
+            select(Annotation.id, Annotation.message_id, Annotation.area)
+            .join(Message, Message.id == Annotation.message_id)
+            .where(Message.project_id == project_id)
+            .order_by(Annotation.area)
+        ).all()
+
+
+async def test_archive_and_restore_round_trip(db_engine, api, new_project, s3):
+    project = await new_project(status="archived")
+    project_id = uuid.UUID(project["id"])
+    # Um mês inteiro bem antes do corte de ARCHIVE_AFTER_DAYS.
+    old = datetime.now(timezone.utc).replace(day=1, hour=12, minute=0, second=0, microsecond=0)
+    old -= timedelta(days=200)
+    with Session(db_engine) as session, session.begin():
+        for index in range(3):
+            message = Message(
+                project_id=project_id, type="text", transcript=f"antiga {index}", created_at=old + timedelta(hours=index)
+            )
+            session.add(message)
+            session.flush()
+            session.add(Annotation(message_id=message.id, message_created_at=message.created_at, area=f"área {index}"))
+    await api.post(f"/projects/{project_id}/messages", json={"type": "text", "transcript": "recente"})
+    messages_before, annotations_before = _messages(db_engine, project_id), _annotations(db_engine, project_id)
+
+    assert archive.archive_projects(project_id) == 3
+    assert [row.transcript for row in _messages(db_engine, project_id)] == ["recente"]
+    assert _annotations(db_engine, project_id) == []
+    with Session(db_engine) as session:
+        archived = session.scalars(select(MessageArchive).where(MessageArchive.project_id == project_id)).one()
+    assert (archived.message_count, archived.annotation_count, archived.restored_at) == (3, 3, None)
+    assert {(BUCKET, archived.messages_key), (BUCKET, archived.annotations_key)} == set(s3.objects)
+    assert (await api.get(f"/projects/{project_id}/export")).status_code == 409
+
+    restored = await api.post(f"/projects/{project_id}/archive/restore")
+    assert restored.json() == {"restored_messages": 3}
+    assert _messages(db_engine, project_id) == messages_before
+    assert _annotations(db_engine, project_id) == annotations_before
+    assert (await api.get(f"/projects/{project_id}/export")).status_code == 200
+
+    # Mês restaurado fica quente; repetir a restauração não duplica nada.
+    assert archive.archive_projects(project_id) == 0
+    assert archive.restore_project(project_id) == 0
+    assert len(_messages(db_engine, project_id)) == 4
+
+
+async def test_only_archived_projects_lose_old_messages(db_engine, new_project, s3):
+    project = await new_project()
+    project_id = uuid.UUID(project["id"])
+    with Session(db_engine) as session, session.begin():
+        created_at = datetime(2020, 1, 5, tzinfo=timezone.utc)
+        session.add(Message(project_id=project_id, type="text", transcript="antiga", created_at=created_at))
+
+    assert archive.archive_projects(project_id) == 0
+    assert len(_messages(db_engine, project_id)) == 1
+    assert s3.objects == {}
+
+
+async def test_restore_keeps_last_message_at(db_engine, new_project, s3):
+    project = await new_project(status="archived")
+    project_id = uuid.UUID(project["id"])
+    created_at = datetime(2021, 3, 10, tzinfo=timezone.utc)
+    with Session(db_engine) as session, session.begin():
+        session.add(Message(project_id=project_id, type="text", transcript="antiga", created_at=created_at))
+        session.execute(Project.__table__.update().where(Project.id == project_id).values(last_message_at=created_at))
+
+    assert archive.archive_projects(project_id) == 1
+    assert archive.restore_project(project_id) == 1
+    with Session(db_engine) as session:
+        assert session.scalar(select(Project.last_message_at).where(Project.id == project_id)) == created_at
+        archives = select(func.count()).select_from(MessageArchive).where(MessageArchive.project_id == project_id)
+        assert session.scalar(archives) == 1
@@ -0,0 +1,77 @@
+import os
+import random
+import time
+import uuid
+
+import pytest
+
+from benchmarks.compare import compare_results
+
+
+def _result(p95=100.0, p99=200.0, rps=50.0, requests=1000, errors=0):
+    return {"p95_ms": p95, "p99_ms": p99, "rps": rps, "requests": requests, "errors": errors}
+
+
+def _run(**routes):
+    return {"routes": routes}
+
+
+def test_within_threshold_is_not_a_regression():
+    baseline = _run(portfolio=_result())
+    current = _run(portfolio=_result(p95=109.0, p99=219.0, rps=45.5))
+    assert compare_results(baseline, current, 10) == []
+
+
+def test_latency_regressions():
+    baseline = _run(portfolio=_result())
+    current = _run(portfolio=_result(p95=111.0, p99=250.0))
+    assert compare_results(baseline, current, 10) == [
+        "portfolio: p95_ms 100.0 -> 111.0",
+        "portfolio: p99_ms 200.0 -> 250.0",
+    ]
+
+
+def test_throughput_regression():
+    regressions = compare_results(_run(timeline=_result(rps=50.0)), _run(timeline=_result(rps=44.0)), 10)
+    assert regressions == ["timeline: rps 50.0 -> 44.0"]
+
+
+def test_error_rate_regression():
+    # Tolerância de erros é threshold/10 pontos percentuais: 1% com threshold 10.
+    baseline = _run(timeline=_result(errors=10))
+    assert compare_results(baseline, _run(timeline=_result(errors=19)), 10) == []
+    assert compare_results(baseline, _run(timeline=_result(errors=30)), 10) == ["timeline: erros 1.0% -> 3.0%"]
+
+
+def test_routes_missing_from_current_and_zero_baselines_are_ignored():
+    baseline = _run(portfolio=_result(), export=_result(p95=0.0, p99=0.0, rps=0.0, requests=0))
+    current = _run(export=_result(p95=500.0, p99=900.0, rps=1.0))
+    assert compare_results(baseline, current, 10) == []
+
+
+async def test_transport_errors_are_gated_under_the_route_label():
+    # Timeouts precisam cair na mesma chave dos sucessos; senão a rota nem
+    # aparece no baseline e o gate não vê a regressão.
+    if not os.getenv("DATABASE_URL"):
+        pytest.skip("DATABASE_URL não configurada")
+    import httpx
+
+    from benchmarks.api_load import Workload, _worker, build_result
+
+    def handler(request):
+        raise httpx.ReadTimeout("timeout", request=request)
+
+    project_id, milestone_id = uuid.uuid4(), uuid.uuid4()
+    dataset = {"projects": {uuid.uuid4(): [project_id]}, "participants": {}, "milestones": {project_id: [milestone_id]}}
+    workload = Workload(dataset, ["a@example.com"], [], random.Random(1))
+    samples, errors = {}, {}
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://teste") as client:
+        await _worker(client, workload, time.perf_counter() + 0.05, 0, samples, errors)
+    current = build_result(samples, errors, 0.05)
+
+    route = "GET /projects/{project_id}"
+    assert set(errors) == set(samples)
+    assert all(" /" in label for label in errors)
+    assert current["routes"][route]["errors"] == current["routes"][route]["requests"]
+    baseline = _run(**{route: _result()})
+    assert f"{route}: erros 0.0% -> 100.0%" in compare_results(baseline, current, 10)
@@ -0,0 +1,49 @@
+import uuid
+
+
+async def test_project_revalidates_until_it_changes(api, new_project):
+    project = await new_project()
+    url = f"/projects/{project['id']}"
+
+    first = await api.get(url)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+    etag = first.headers["etag"]
+
+    unchanged = await api.get(url, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+    assert unchanged.content == b""
+
+    await api.post(f"{url}/daily-logs", json={"date": "2024-05-10", "score_schedule": 80, "score_budget": 70})
+    changed = await api.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+async def test_project_list_and_portfolio_revalidate_per_owner(api, new_project):
+    owner_id = str(uuid.uuid4())
+    project = await new_project(owner_id=owner_id, title="Casa A")
+
+    for path in ("/projects", "/projects/portfolio"):
+        first = await api.get(path, params={"owner_id": owner_id})
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert (await api.get(path, params={"owner_id": owner_id}, headers={"If-None-Match": etag})).status_code == 304
+
+    listed = (await api.get("/projects", params={"owner_id": owner_id})).json()
+    assert [item["id"] for item in listed] == [project["id"]]
+    assert listed[0]["title"] == "Casa A"
+
+    etags = {}
+    for path in ("/projects", "/projects/portfolio"):
+        etags[path] = (await api.get(path, params={"owner_id": owner_id})).headers["etag"]
+    await new_project(owner_id=owner_id, title="Casa B")
+    for path, etag in etags.items():
+        response = await api.get(path, params={"owner_id": owner_id}, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert len(response.json()) == 2
+
+
+async def test_project_list_requires_owner(api, db_engine):
+    assert (await api.get("/projects")).status_code == 422
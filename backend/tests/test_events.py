@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import uuid
+
+import pytest
+from sqlalchemy.orm import Session
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não configurada", allow_module_level=True)
+
+from app import events  # noqa: E402
+from app.events import ProjectEventHub, _listener_dsn, notify_project_event  # noqa: E402
+
+
+@pytest.fixture
+async def hub(db_engine):
+    hub = ProjectEventHub(_listener_dsn())
+    yield hub
+    await hub.close()
+
+
+async def _wait_listening(hub: ProjectEventHub, db_engine) -> None:
+    # O LISTEN sobe em segundo plano: notifica um projeto sentinela até chegar.
+    sentinel = hub.subscribe(uuid.uuid4())
+    for _ in range(100):
+        with Session(db_engine) as session, session.begin():
+            notify_project_event(session, uuid.UUID(sentinel.project_id), "ping", uuid.uuid4())
+        try:
+            await asyncio.wait_for(sentinel.queue.get(), 0.05)
+            break
+        except asyncio.TimeoutError:
+            continue
+    else:
+        pytest.fail("LISTEN não ficou pronto")
+    hub.unsubscribe(sentinel)
+
+
+async def test_events_fan_out_to_every_subscriber_of_the_project(db_engine, hub, api, new_project):
+    project, other = await new_project(), await new_project()
+    first = hub.subscribe(uuid.UUID(project["id"]))
+    second = hub.subscribe(uuid.UUID(project["id"]))
+    unrelated = hub.subscribe(uuid.UUID(other["id"]))
+    await _wait_listening(hub, db_engine)
+
+    response = await api.post(f"/projects/{project['id']}/messages", json={"type": "text", "transcript": "oi"})
+    message = response.json()
+
+    for subscription in (first, second):
+        payload = json.loads(await asyncio.wait_for(subscription.queue.get(), 5))
+        assert payload == {"project_id": project["id"], "kind": "message", "id": message["id"]}
+    assert unrelated.queue.empty()
+    assert hub.subscriber_count == 3
+
+
+async def test_rolled_back_events_are_not_delivered(db_engine, hub):
+    project_id = uuid.uuid4()
+    subscription = hub.subscribe(project_id)
+    await _wait_listening(hub, db_engine)
+
+    with Session(db_engine) as session:
+        notify_project_event(session, project_id, "message", uuid.uuid4())
+        session.rollback()
+    with Session(db_engine) as session, session.begin():
+        notify_project_event(session, project_id, "payment", uuid.uuid4())
+
+    payload = json.loads(await asyncio.wait_for(subscription.queue.get(), 5))
+    assert payload["kind"] == "payment"
+    assert subscription.queue.empty()
+
+
+async def test_slow_subscriber_is_dropped(monkeypatch, hub):
+    monkeypatch.setattr(events, "QUEUE_SIZE", 1)
+    project_id = str(uuid.uuid4())
+    slow = hub.subscribe(uuid.UUID(project_id))
+    payload = json.dumps({"project_id": project_id, "kind": "message"})
+
+    hub._dispatch(payload)
+    hub._dispatch(payload)
+
+    assert slow.dropped
+    assert hub.subscriber_count == 0
+
+
+async def test_invalid_payloads_are_ignored(hub):
+    subscription = hub.subscribe(uuid.uuid4())
+    hub._dispatch("não é json")
+    hub._dispatch(json.dumps({"kind": "message"}))
+    assert subscription.queue.empty()
@@ -0,0 +1,50 @@
+import os
+import uuid
+
+import orjson
+import pytest
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não configurada", allow_module_level=True)
+
+from app.export import ExportEntity, _snapshot, entity_statements, ndjson_stream  # noqa: E402
+
+
+async def test_ndjson_export_is_one_snapshot(db_engine, api, new_project):
+    project = await new_project()
+    project_id = project["id"]
+    await api.post(f"/projects/{project_id}/messages", json={"type": "text", "transcript": "oi"})
+
+    stream = ndjson_stream(db_engine, entity_statements(uuid.UUID(project_id)))
+    first = next(stream)
+    # Escritas depois que a exportação começou não aparecem nas seções seguintes.
+    milestone = (await api.post(f"/projects/{project_id}/milestones", json={"name": "Laje", "amount": 1000})).json()
+    await api.post(f"/projects/{project_id}/payments", json={"milestone_id": milestone["id"], "provider": "pix"})
+    lines = [orjson.loads(line) for line in (first + b"".join(stream)).splitlines()]
+
+    assert [line["entity"] for line in lines] == ["messages"]
+    assert lines[0]["transcript"] == "oi"
+
+
+def test_snapshot_is_repeatable_read_and_read_only(db_engine):
+    with _snapshot(db_engine) as conn:
+        assert conn.exec_driver_sql("SHOW transaction_isolation").scalar() == "repeatable read"
+        assert conn.exec_driver_sql("SHOW transaction_read_only").scalar() == "on"
+
+
+async def test_export_entity_is_validated(api, new_project):
+    project = await new_project()
+    invalid = await api.get(f"/projects/{project['id']}/export", params={"format": "csv", "entity": "users"})
+    assert invalid.status_code == 422
+
+    valid = await api.get(f"/projects/{project['id']}/export", params={"format": "csv", "entity": "daily_logs"})
+    assert valid.status_code == 200
+    assert f"projeto-{project['id']}-daily_logs.csv" in valid.headers["content-disposition"]
+    assert valid.text.splitlines()[0] == "id,project_id,date,summary_text,score_schedule,score_budget"
+
+
+def test_entities_listed_in_openapi():
+    from app.main import app
+
+    schema = app.openapi()["components"]["schemas"]["ExportEntity"]
+    assert schema["enum"] == [entity.value for entity in ExportEntity]
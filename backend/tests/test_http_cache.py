@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+from starlette.requests import Request
+
+from app.http_cache import is_not_modified, make_etag
+
+ETAG = make_etag("p1", 3)
+LAST_MODIFIED = datetime(2024, 5, 10, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+def _request(**headers) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+        }
+    )
+
+
+def test_without_conditional_headers():
+    assert not is_not_modified(_request(), ETAG, LAST_MODIFIED)
+
+
+def test_if_none_match():
+    assert is_not_modified(_request(if_none_match=ETAG), ETAG, LAST_MODIFIED)
+    # Comparação fraca: a ETag forte equivalente também casa.
+    assert is_not_modified(_request(if_none_match='"p1-3"'), ETAG, LAST_MODIFIED)
+    assert is_not_modified(_request(if_none_match=f'W/"outra", {ETAG}'), ETAG, LAST_MODIFIED)
+    assert is_not_modified(_request(if_none_match="*"), ETAG, LAST_MODIFIED)
+    assert not is_not_modified(_request(if_none_match='W/"p1-2"'), ETAG, LAST_MODIFIED)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    request = _request(if_none_match='W/"p1-2"', if_modified_since="Fri, 10 May 2024 12:30:15 GMT")
+    assert not is_not_modified(request, ETAG, LAST_MODIFIED)
+
+
+def test_if_modified_since():
+    # HTTP-date não tem frações de segundo: o mesmo segundo conta como não modificado.
+    assert is_not_modified(_request(if_modified_since="Fri, 10 May 2024 12:30:15 GMT"), ETAG, LAST_MODIFIED)
+    assert is_not_modified(_request(if_modified_since="Sat, 11 May 2024 00:00:00 GMT"), ETAG, LAST_MODIFIED)
+    assert not is_not_modified(_request(if_modified_since="Fri, 10 May 2024 12:30:14 GMT"), ETAG, LAST_MODIFIED)
+
+
+def test_if_modified_since_ignored_when_invalid_or_without_last_modified():
+    assert not is_not_modified(_request(if_modified_since="ontem"), ETAG, LAST_MODIFIED)
+    assert not is_not_modified(_request(if_modified_since="Sat, 11 May 2024 00:00:00 GMT"), ETAG, None)
@@ -0,0 +1,259 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import jwt
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
+from prometheus_client import REGISTRY
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não configurada", allow_module_level=True)
+
+from sqlalchemy import select  # noqa: E402
+
+from app.idempotency import MAX_SCOPE_LENGTH, IdempotencyMiddleware, _request_hash, _route_scope  # noqa: E402
+from app.metrics import MetricsMiddleware  # noqa: E402
+from app.models import IdempotencyKey  # noqa: E402
+
+SECRET = "segredo-de-teste"
+
+
+class Routes:
+    # App mínimo com as rotas cobertas pelo middleware; conta quantas vezes
+    # cada uma chegou a rodar.
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.entered = asyncio.Event()
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.app = FastAPI()
+
+        @self.app.post("/projects", status_code=201)
+        async def create_project(payload: dict):
+            self.calls += 1
+            return {"call": self.calls, **payload}
+
+        @self.app.post("/projects/{project_id}/messages", status_code=201)
+        async def post_message(project_id: str, payload: dict, response: Response):
+            self.calls += 1
+            self.entered.set()
+            await self.gate.wait()
+            response.headers["Location"] = f"/projects/{project_id}/messages/{self.calls}"
+            response.set_cookie("zenbild_token", "nao-guardar")
+            return {"call": self.calls, **payload}
+
+        @self.app.post("/projects/{project_id}/payments", status_code=201)
+        async def register_payment(project_id: str, payload: dict):
+            self.calls += 1
+            if self.failures:
+                self.failures -= 1
+                return JSONResponse({"detail": "indisponível"}, status_code=503)
+            return {"call": self.calls}
+
+        @self.app.post("/auth/magic/consume")
+        async def consume(response: Response):
+            self.calls += 1
+            response.set_cookie("zenbild_token", "sessao")
+            return {"call": self.calls}
+
+
+@pytest.fixture
+def routes():
+    return Routes()
+
+
+@pytest.fixture
+def middleware(db_engine, routes):
+    return IdempotencyMiddleware(routes.app, target=db_engine)
+
+
+def _client(asgi) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi), base_url="http://teste")
+
+
+def _url(route="messages") -> str:
+    return f"/projects/{uuid.uuid4()}/{route}"
+
+
+def _key() -> dict:
+    return {"Idempotency-Key": uuid.uuid4().hex}
+
+
+def _row(db_engine, key: str):
+    with db_engine.connect() as conn:
+        return conn.execute(select(IdempotencyKey).where(IdempotencyKey.key == key)).first()
+
+
+def _token(user_id: str) -> str:
+    return jwt.encode({"sub": user_id}, SECRET, algorithm="HS256")
+
+
+async def test_first_request_is_stored_without_cookies(db_engine, middleware, routes):
+    headers = _key()
+    async with _client(middleware) as client:
+        response = await client.post(_url(), json={"text": "oi"}, headers=headers)
+
+    assert response.status_code == 201
+    assert response.json() == {"call": 1, "text": "oi"}
+    assert "idempotent-replayed" not in response.headers
+    row = _row(db_engine, headers["Idempotency-Key"])
+    assert row.status_code == 201
+    assert row.body == response.content
+    stored = dict(row.headers)
+    assert stored["content-type"] == "application/json"
+    assert stored["location"] == response.headers["location"]
+    assert "set-cookie" not in stored
+    assert "content-length" not in stored
+
+
+async def test_replay_returns_stored_response(db_engine, middleware, routes):
+    url, headers = _url(), _key()
+    async with _client(middleware) as client:
+        first = await client.post(url, json={"text": "oi"}, headers=headers)
+        from_cache = await client.post(url, json={"text": "oi"}, headers=headers)
+    # Outro worker, com o LRU vazio: a resposta vem de idempotency_keys.
+    async with _client(IdempotencyMiddleware(routes.app, target=db_engine)) as client:
+        from_db = await client.post(url, json={"text": "oi"}, headers=headers)
+
+    assert routes.calls == 1
+    for replay in (from_cache, from_db):
+        assert replay.status_code == 201
+        assert replay.content == first.content
+        assert replay.headers["idempotent-replayed"] == "true"
+        assert replay.headers["location"] == first.headers["location"]
+        assert "set-cookie" not in replay.headers
+
+
+async def test_body_mismatch_is_rejected(middleware, routes):
+    url, headers = _url(), _key()
+    async with _client(middleware) as client:
+        await client.post(url, json={"text": "oi"}, headers=headers)
+        response = await client.post(url, json={"text": "outro"}, headers=headers)
+        query = await client.post(url, params={"x": "1"}, json={"text": "oi"}, headers=headers)
+
+    assert response.status_code == 422
+    assert query.status_code == 422
+    assert routes.calls == 1
+
+
+async def test_concurrent_duplicate_gets_409(middleware, routes):
+    url, headers = _url(), _key()
+    routes.gate.clear()
+    async with _client(middleware) as client:
+        first = asyncio.create_task(client.post(url, json={"text": "oi"}, headers=headers))
+        await asyncio.wait_for(routes.entered.wait(), 5)
+        duplicate = await client.post(url, json={"text": "oi"}, headers=headers)
+        routes.gate.set()
+        first = await first
+
+    assert duplicate.status_code == 409
+    assert duplicate.headers["retry-after"] == "1"
+    assert first.status_code == 201
+    assert routes.calls == 1
+
+
+async def test_server_error_releases_key(db_engine, middleware, routes):
+    url, headers = _url("payments"), _key()
+    routes.failures = 1
+    async with _client(middleware) as client:
+        failed = await client.post(url, json={"amount": 10}, headers=headers)
+        assert failed.status_code == 503
+        assert _row(db_engine, headers["Idempotency-Key"]) is None
+
+        retried = await client.post(url, json={"amount": 10}, headers=headers)
+
+    assert retried.status_code == 201
+    assert retried.json() == {"call": 2}
+    assert _row(db_engine, headers["Idempotency-Key"]).status_code == 201
+
+
+async def test_expired_row_is_taken_over(db_engine, middleware, routes):
+    # Reserva órfã de um worker que morreu, já vencida e com outro corpo.
+    url, headers = _url(), _key()
+    scope = f"POST {url} anon"
+    with db_engine.begin() as conn:
+        conn.execute(
+            IdempotencyKey.__table__.insert().values(
+                key=headers["Idempotency-Key"],
+                scope=scope,
+                request_hash=_request_hash({}, b"antigo"),
+                expires_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+            )
+        )
+
+    async with _client(middleware) as client:
+        response = await client.post(url, json={"text": "oi"}, headers=headers)
+
+    assert response.status_code == 201
+    assert routes.calls == 1
+    row = _row(db_engine, headers["Idempotency-Key"])
+    assert row.status_code == 201
+    assert row.expires_at > datetime.now(timezone.utc)
+
+
+async def test_key_is_scoped_by_caller(monkeypatch, middleware, routes):
+    monkeypatch.setenv("JWT_SECRET", SECRET)
+    url, headers = _url(), _key()
+    alice, bob = _token("alice"), _token("bob")
+    async with _client(middleware) as client:
+        first = await client.post(url, json={"text": "oi"}, headers={**headers, "Authorization": f"Bearer {alice}"})
+        other = await client.post(url, json={"text": "oi"}, headers={**headers, "Authorization": f"Bearer {bob}"})
+        client.cookies.set("zenbild_token", alice)
+        same = await client.post(url, json={"text": "oi"}, headers=headers)
+
+    assert first.json()["call"] == 1
+    assert other.json()["call"] == 2
+    assert "idempotent-replayed" not in other.headers
+    assert same.headers["idempotent-replayed"] == "true"
+    assert same.content == first.content
+
+
+async def test_other_routes_are_not_covered(db_engine, middleware, routes):
+    headers = _key()
+    async with _client(middleware) as client:
+        first = await client.post("/auth/magic/consume", headers=headers)
+        second = await client.post("/auth/magic/consume", headers=headers)
+
+    assert first.json() == {"call": 1}
+    assert second.json() == {"call": 2}
+    assert "zenbild_token" in second.headers["set-cookie"]
+    assert _row(db_engine, headers["Idempotency-Key"]) is None
+
+
+async def test_every_project_post_is_covered(middleware, routes):
+    headers = _key()
+    async with _client(middleware) as client:
+        first = await client.post("/projects", json={"title": "obra"}, headers=headers)
+        retried = await client.post("/projects", json={"title": "obra"}, headers=headers)
+
+    assert routes.calls == 1
+    assert retried.headers["idempotent-replayed"] == "true"
+    assert retried.content == first.content
+
+
+async def test_replays_are_labelled_with_the_route_template(db_engine, routes):
+    # Como em app.main: métricas por fora, idempotência por dentro do app.
+    routes.app.add_middleware(IdempotencyMiddleware, target=db_engine)
+    asgi = MetricsMiddleware(routes.app)
+    labels = {"method": "POST", "route": "/projects/{project_id}/messages", "status": "201"}
+    before = REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0
+
+    url, headers = _url(), _key()
+    async with _client(asgi) as client:
+        await client.post(url, json={"text": "oi"}, headers=headers)
+        replay = await client.post(url, json={"text": "oi"}, headers=headers)
+
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) == before + 2
+
+
+def test_long_paths_get_a_hashed_scope():
+    scope = {"path": "/projects/" + "x" * 400, "headers": []}
+    assert len(_route_scope(scope)) <= MAX_SCOPE_LENGTH
+    assert _route_scope(scope) == _route_scope(dict(scope))
@@ -0,0 +1,64 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+
+from app.metrics import MetricsMiddleware, router
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+
+    @app.get("/projects/{project_id}")
+    def get_project(project_id: str):
+        return {"id": project_id}
+
+    app.include_router(router)
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def _client(app) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste")
+
+
+async def test_metrics_is_hidden_without_token(monkeypatch, app):
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    async with _client(app) as client:
+        response = await client.get("/metrics", headers={"Authorization": "Bearer qualquer"})
+    assert response.status_code == 404
+
+
+async def test_metrics_requires_the_token(monkeypatch, app):
+    monkeypatch.setenv("METRICS_TOKEN", "segredo")
+    async with _client(app) as client:
+        missing = await client.get("/metrics")
+        wrong = await client.get("/metrics", headers={"Authorization": "Bearer errado"})
+        ok = await client.get("/metrics", headers={"Authorization": "Bearer segredo"})
+    assert missing.status_code == 401
+    assert wrong.status_code == 401
+    assert ok.status_code == 200
+    assert "http_request_duration_seconds" in ok.text
+
+
+async def test_requests_are_labelled_by_route_template(app):
+    labels = {"method": "GET", "route": "/projects/{project_id}", "status": "200"}
+    before = REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0
+    async with _client(app) as client:
+        await client.get("/projects/a")
+        await client.get("/projects/b")
+        await client.get("/nao-existe")
+    assert REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) == before + 2
+    unmatched = {"method": "GET", "route": "unmatched", "status": "404"}
+    assert REGISTRY.get_sample_value("http_request_duration_seconds_count", unmatched) >= 1
+
+
+async def test_database_queries_are_counted_per_request(api, new_project):
+    project = await new_project()
+    labels = {"method": "GET", "route": "/projects/{project_id}"}
+    before = REGISTRY.get_sample_value("http_request_db_queries_sum", labels) or 0
+    assert (await api.get(f"/projects/{project['id']}")).status_code == 200
+    # Versão para a ETag e depois a linha do projeto.
+    assert REGISTRY.get_sample_value("http_request_db_queries_sum", labels) == before + 2
+    assert REGISTRY.get_sample_value("db_pool_size", {"engine": "primary"}) is not None
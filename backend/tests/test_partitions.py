@@ -0,0 +1,40 @@
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+
+from app.partitions import MONTHS_AHEAD, add_months, ensure_message_partitions, month_start, partition_name
+
+
+def test_add_months():
+    assert add_months(date(2024, 1, 1), 1) == date(2024, 2, 1)
+    assert add_months(date(2024, 11, 1), 2) == date(2025, 1, 1)
+    assert add_months(date(2024, 12, 1), 1) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert add_months(date(2024, 3, 1), -27) == date(2021, 12, 1)
+    assert add_months(date(2024, 3, 1), 0) == date(2024, 3, 1)
+
+
+def test_partition_name():
+    assert partition_name(date(2024, 3, 1)) == "messages_p2024_03"
+
+
+def test_ensure_message_partitions(db_engine):
+    # Tudo numa transação desfeita no fim: o banco de teste fica como estava.
+    this_month = month_start(datetime.now(timezone.utc).date())
+    farthest = add_months(this_month, MONTHS_AHEAD + 2)
+    with db_engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            created = ensure_message_partitions(conn, months_ahead=MONTHS_AHEAD + 2)
+            assert partition_name(farthest) in created
+            conn.exec_driver_sql("SET LOCAL TIME ZONE 'UTC'")
+            bound = conn.execute(
+                text("SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE relname = :name"),
+                {"name": partition_name(farthest)},
+            ).scalar()
+            assert f"FROM ('{farthest.isoformat()} 00:00:00+00')" in bound
+            assert f"TO ('{add_months(farthest, 1).isoformat()} 00:00:00+00')" in bound
+
+            assert ensure_message_partitions(conn, months_ahead=MONTHS_AHEAD + 2) == []
+        finally:
+            trans.rollback()
@@ -0,0 +1,65 @@
+import uuid
+
+
+async def _milestone(api, project_id: str, **fields) -> dict:
+    response = await api.post(f"/projects/{project_id}/milestones", json=fields)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def _payment(api, project_id: str, milestone_id: str, provider: str = "pix", status: str = "pending") -> None:
+    payload = {"milestone_id": milestone_id, "provider": provider, "status": status}
+    response = await api.post(f"/projects/{project_id}/payments", json=payload)
+    assert response.status_code == 201, response.text
+
+
+async def test_portfolio_aggregates(api, new_project):
+    owner_id = str(uuid.uuid4())
+    busy = await new_project(owner_id=owner_id, title="Obra movimentada")
+    empty = await new_project(owner_id=owner_id, title="Obra parada")
+    await new_project(title="Obra de outro dono")
+    project_id = busy["id"]
+
+    # Próximo marco: pendente com o prazo mais cedo; marcos sem prazo vão por último.
+    await _milestone(api, project_id, name="Sem prazo", amount=50)
+    due_later = await _milestone(api, project_id, name="Telhado", amount=300, due_date="2024-08-01")
+    due_first = await _milestone(api, project_id, name="Fundação", amount=1000, due_date="2024-06-01")
+    done = await _milestone(api, project_id, name="Terreno", amount=9000, due_date="2024-01-01", status="paid")
+
+    # Dois links pendentes no mesmo marco contam o valor uma vez só.
+    await _payment(api, project_id, due_first["id"], "pix")
+    await _payment(api, project_id, due_first["id"], "boleto")
+    await _payment(api, project_id, due_later["id"], status="completed")
+    await _payment(api, project_id, done["id"], status="failed")
+
+    for day, schedule in (("2024-05-01", 40), ("2024-05-03", 90), ("2024-05-02", 60)):
+        payload = {"date": day, "score_schedule": schedule, "score_budget": 50}
+        await api.post(f"/projects/{project_id}/daily-logs", json=payload)
+    response = await api.post(f"/projects/{project_id}/messages", json={"type": "text", "transcript": "oi"})
+    message = response.json()
+
+    response = await api.get("/projects/portfolio", params={"owner_id": owner_id})
+    assert response.status_code == 200
+    items = {item["project"]["id"]: item for item in response.json()}
+    assert set(items) == {busy["id"], empty["id"]}
+
+    item = items[project_id]
+    assert item["next_milestone"] == {
+        "id": due_first["id"],
+        "name": "Fundação",
+        "amount": 1000.0,
+        "due_date": "2024-06-01",
+    }
+    assert item["latest_daily_log"] == {"date": "2024-05-03", "score_schedule": 90, "score_budget": 50}
+    assert item["pending_payments"] == 2
+    assert item["outstanding_amount"] == 1000.0
+    assert item["last_message_at"] == message["created_at"]
+
+    assert items[empty["id"]] == {
+        "project": items[empty["id"]]["project"],
+        "latest_daily_log": None,
+        "next_milestone": None,
+        "pending_payments": 0,
+        "outstanding_amount": 0.0,
+        "last_message_at": None,
+    }
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app import profiling
+from app.profiling import Sampler, _ProfiledRequest, install_profiling
+
+SECRET = "segredo-de-teste"
+
+
+def _busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampler_records_stacks_of_attached_threads():
+    sampler = Sampler(interval_ms=1)
+    request = _ProfiledRequest()
+    request.threads.add(threading.get_ident())
+    sampler.start(request)
+    _busy_wait(0.1)
+    sampler.stop(request, "GET /lento")
+
+    stacks = sampler.route_stacks("GET /lento")
+    assert sum(stacks.values()) > 0
+    assert any("_busy_wait" in stack for stack in stacks)
+    assert sampler.totals() == {"GET /lento": sum(stacks.values())}
+
+
+def test_stopped_requests_get_no_more_samples():
+    sampler = Sampler(interval_ms=1)
+    request = _ProfiledRequest()
+    request.threads.add(threading.get_ident())
+    sampler.start(request)
+    _busy_wait(0.05)
+    sampler.stop(request, "GET /lento")
+    recorded = sum(request.stacks.values())
+
+    # A thread continua ocupada, mas a requisição já saiu do sampler.
+    other = _ProfiledRequest()
+    sampler.start(other)
+    _busy_wait(0.05)
+    sampler.stop(other, "GET /outra")
+    assert sum(request.stacks.values()) == recorded
+
+
+def test_route_stacks_is_a_copy():
+    sampler = Sampler(interval_ms=1)
+    request = _ProfiledRequest()
+    request.stacks["a;b"] = 3
+    sampler.stop(request, "GET /x")
+
+    copy = sampler.route_stacks("GET /x")
+    copy["a;b"] += 10
+    assert sampler.route_stacks("GET /x") == {"a;b": 3}
+    assert sampler.route_stacks("GET /nada") == {}
+
+
+async def test_admin_endpoints_serve_sampled_routes(monkeypatch):
+    monkeypatch.setattr(profiling, "SECRET", SECRET)
+    profiling.sampler.reset()
+    app = FastAPI()
+
+    @app.get("/lento")
+    def slow():
+        _busy_wait(0.1)
+        return {"ok": True}
+
+    install_profiling(app)
+    headers = {profiling.HEADER: SECRET}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste") as client:
+        assert (await client.get("/lento", headers=headers)).status_code == 200
+        assert (await client.get("/admin/profiles")).status_code == 403
+
+        listing = (await client.get("/admin/profiles", headers=headers)).json()
+        collapsed = await client.get("/admin/profiles/collapsed", params={"route": "GET /lento"}, headers=headers)
+        speedscope = await client.get("/admin/profiles/speedscope", params={"route": "GET /lento"}, headers=headers)
+        missing = await client.get("/admin/profiles/collapsed", params={"route": "GET /nada"}, headers=headers)
+
+    assert listing["routes"]["GET /lento"] > 0
+    assert "_busy_wait" in collapsed.text
+    assert speedscope.json()["profiles"][0]["endValue"] > 0
+    assert missing.status_code == 404
+    profiling.sampler.reset()
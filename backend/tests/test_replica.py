@@ -0,0 +1,73 @@
+import os
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não configurada", allow_module_level=True)
+
+from app import db  # noqa: E402
+from app.replica import COOKIE_NAME, STICKY_SECONDS, ReadYourWritesMiddleware  # noqa: E402
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Uma "réplica" distinta do primário para ver para onde cada leitura vai.
+    monkeypatch.setattr(db, "read_engine", object())
+    app = FastAPI()
+
+    @app.get("/leitura")
+    def read():
+        return {"primary": db.reader_engine() is db.engine}
+
+    @app.post("/escrita")
+    def write():
+        return {"ok": True}
+
+    @app.post("/escrita-invalida")
+    def invalid_write():
+        raise HTTPException(status_code=422, detail="inválido")
+
+    app.add_middleware(ReadYourWritesMiddleware)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://teste")
+
+
+def _cookie(until: object) -> dict:
+    return {"Cookie": f"{COOKIE_NAME}={until}"}
+
+
+async def test_reads_go_to_the_replica_by_default(client):
+    async with client:
+        response = await client.get("/leitura")
+    assert response.json() == {"primary": False}
+    assert "set-cookie" not in response.headers
+
+
+async def test_successful_writes_set_the_sticky_cookie(client):
+    async with client:
+        write = await client.post("/escrita")
+        invalid = await client.post("/escrita-invalida")
+
+    cookie = write.headers["set-cookie"]
+    assert cookie.startswith(f"{COOKIE_NAME}=")
+    assert f"Max-Age={STICKY_SECONDS}" in cookie
+    until = int(cookie.split(";")[0].split("=")[1])
+    assert time.time() < until <= time.time() + STICKY_SECONDS
+    assert "set-cookie" not in invalid.headers
+
+
+async def test_reads_stick_to_the_primary_until_the_cookie_expires(client):
+    async with client:
+        sticky = await client.get("/leitura", headers=_cookie(int(time.time()) + STICKY_SECONDS))
+        expired = await client.get("/leitura", headers=_cookie(int(time.time()) - 1))
+        garbage = await client.get("/leitura", headers=_cookie("amanha"))
+        among_others = await client.get(
+            "/leitura", headers={"Cookie": f"zenbild_token=abc; {COOKIE_NAME}={int(time.time()) + STICKY_SECONDS}"}
+        )
+
+    assert sticky.json() == {"primary": True}
+    assert expired.json() == {"primary": False}
+    assert garbage.json() == {"primary": False}
+    assert among_others.json() == {"primary": True}
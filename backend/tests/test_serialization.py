@@ -0,0 +1,43 @@
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import orjson
+import pytest
+
+from app.serialization import FastJSONResponse, dumps, rows_as_dicts
+
+
+def test_dumps_matches_the_pydantic_json_shapes():
+    value = {
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "created_at": datetime(2024, 5, 10, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        "local": datetime(2024, 5, 10, 9, 30, tzinfo=timezone(timedelta(hours=-3))),
+        "date": date(2024, 5, 10),
+        "amount": Decimal("1000.50"),
+        "empty": None,
+    }
+    assert orjson.loads(dumps(value)) == {
+        "id": "12345678-1234-5678-1234-567812345678",
+        "created_at": "2024-05-10T12:30:15.123456Z",
+        "local": "2024-05-10T09:30:00-03:00",
+        "date": "2024-05-10",
+        "amount": 1000.5,
+        "empty": None,
+    }
+
+
+def test_dumps_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_rows_as_dicts_and_response():
+    rows = [(1, "a"), (2, None)]
+    body = rows_as_dicts(["id", "name"], rows)
+    assert body == [{"id": 1, "name": "a"}, {"id": 2, "name": None}]
+
+    response = FastJSONResponse(body)
+    assert response.media_type == "application/json"
+    assert orjson.loads(response.body) == body
+    assert FastJSONResponse(b"[]").body == b"[]"
@@ -0,0 +1,85 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+if not os.getenv("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não configurada", allow_module_level=True)
+
+from app.models import Message, Project  # noqa: E402
+from app.routers.projects import MessageRead  # noqa: E402
+
+
+def _add_messages(db_engine, project_id: uuid.UUID, created_ats: list[datetime]) -> None:
+    with Session(db_engine) as session, session.begin():
+        for index, created_at in enumerate(created_ats):
+            session.add(Message(project_id=project_id, type="text", transcript=f"m{index}", created_at=created_at))
+        session.execute(
+            update(Project).where(Project.id == project_id).values(last_message_at=max(created_ats))
+        )
+
+
+async def _pages(api, project_id: str, limit: int) -> list[list[dict]]:
+    pages, params = [], {"limit": limit}
+    while True:
+        response = await api.get(f"/projects/{project_id}/messages", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        if not page:
+            return pages
+        pages.append(page)
+        params = {"limit": limit, "before": page[-1]["created_at"], "before_id": page[-1]["id"]}
+
+
+async def test_cursor_pages_tied_timestamps_exactly_once(db_engine, api, new_project):
+    project = await new_project()
+    project_id = uuid.UUID(project["id"])
+    tied = datetime(2024, 5, 10, 12, 0, tzinfo=timezone.utc)
+    _add_messages(db_engine, project_id, [tied] * 7 + [tied + timedelta(minutes=1), tied - timedelta(minutes=1)])
+
+    pages = await _pages(api, project["id"], 3)
+    items = [item for page in pages for item in page]
+
+    assert [len(page) for page in pages] == [3, 3, 3]
+    assert len({item["id"] for item in items}) == 9
+    keys = [(item["created_at"], item["id"]) for item in items]
+    assert keys == sorted(keys, reverse=True)
+
+
+async def test_timeline_reaches_past_the_recent_window(db_engine, api, new_project):
+    # Mensagens mais velhas que TIMELINE_WINDOW vêm da segunda consulta.
+    project = await new_project()
+    latest = datetime(2024, 5, 10, tzinfo=timezone.utc)
+    created_ats = [latest, latest - timedelta(days=40), latest - timedelta(days=400)]
+    _add_messages(db_engine, uuid.UUID(project["id"]), created_ats)
+
+    response = await api.get(f"/projects/{project['id']}/messages", params={"limit": 10})
+    assert [item["transcript"] for item in response.json()] == ["m0", "m1", "m2"]
+
+
+async def test_before_id_requires_before(api, new_project):
+    project = await new_project()
+    response = await api.get(f"/projects/{project['id']}/messages", params={"before_id": str(uuid.uuid4())})
+    assert response.status_code == 400
+
+
+async def test_fast_path_matches_pydantic_serialization(db_engine, api, new_project):
+    project = await new_project()
+    for payload in ({"type": "text", "transcript": "oi"}, {"type": "audio", "url": "https://exemplo/a.ogg"}):
+        assert (await api.post(f"/projects/{project['id']}/messages", json=payload)).status_code == 201
+
+    response = await api.get(f"/projects/{project['id']}/messages")
+    with Session(db_engine) as session:
+        messages = session.scalars(
+            select(Message)
+            .where(Message.project_id == uuid.UUID(project["id"]))
+            .order_by(Message.created_at.desc(), Message.id.desc())
+        ).all()
+        expected = [MessageRead.model_validate(message).model_dump(mode="json") for message in messages]
+
+    assert len(expected) == 2
+    assert orjson.loads(response.content) == expected